@@ -0,0 +1,63 @@
+# Copyright (C) 2024 twyleg
+import contextlib
+import logging
+import os
+import stat
+import sys
+import tempfile
+from pathlib import Path
+from typing import IO, Iterator, Set
+
+
+logm = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def atomic_write(filepath: Path, mode: str = "w") -> Iterator[IO]:
+    fd, tmp_file_path = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as tmp_file:
+            yield tmp_file
+        if filepath.exists():
+            os.chmod(tmp_file_path, stat.S_IMODE(os.stat(filepath).st_mode))
+        os.replace(tmp_file_path, filepath)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_file_path)
+        raise
+
+
+class FsyncBatch:
+
+    def __init__(self) -> None:
+        self.file_paths: Set[Path] = set()
+        self.dir_paths: Set[Path] = set()
+
+    def add_file(self, filepath: Path) -> None:
+        self.file_paths.add(filepath)
+        self.dir_paths.add(filepath.parent)
+
+    def add_dir(self, dir_path: Path) -> None:
+        self.dir_paths.add(dir_path)
+
+    @classmethod
+    def _fsync_path(cls, path: Path) -> None:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def commit(self) -> None:
+        logm.debug("Syncing %d files and %d dirs", len(self.file_paths), len(self.dir_paths))
+        for file_path in self.file_paths:
+            self._fsync_path(file_path)
+
+        # Directories can't be opened for syncing on Windows
+        if sys.platform != "win32":
+            for dir_path in self.dir_paths:
+                if dir_path.exists():
+                    self._fsync_path(dir_path)
+
+        self.file_paths.clear()
+        self.dir_paths.clear()
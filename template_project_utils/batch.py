@@ -0,0 +1,56 @@
+# Copyright (C) 2024 twyleg
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+import jsonschema
+import yaml
+
+from template_project_utils.path_patterns import DEFAULT_EXCLUDED_DIRS
+
+
+FILE_DIR = Path(__file__).parent
+
+logm = logging.getLogger(__name__)
+
+# Not copied into the projects created from a template. The git repo is copied, like it is when the template is cloned.
+EXCLUDED_TEMPLATE_DIRS = [excluded_dir for excluded_dir in DEFAULT_EXCLUDED_DIRS if excluded_dir != ".git"]
+
+
+class BatchEntry(NamedTuple):
+    destination_path: Path
+    placeholder_target_dict: Dict[str, str]
+
+
+def load_batch_manifest(manifest_file_path: Path, template_dir_path: Path) -> List[BatchEntry]:
+    # Destinations are relative to the dir of the manifest. They must not be inside of the template, which would
+    # copy earlier projects of the batch into the later ones (or a project into itself).
+    with open(manifest_file_path, "r") as manifest_file:
+        manifest = yaml.safe_load(manifest_file)
+
+    with open(FILE_DIR / "resources/schemas/batch_manifest.json") as manifest_schema_file:
+        jsonschema.validate(instance=manifest, schema=json.load(manifest_schema_file))
+
+    batch_entries = [
+        BatchEntry((manifest_file_path.parent / project["destination"]).resolve(), project.get("placeholders") or {}) for project in manifest["projects"]
+    ]
+    for batch_entry in batch_entries:
+        if batch_entry.destination_path.is_relative_to(template_dir_path.resolve()):
+            raise RuntimeError(f"Destination must not be inside of the template dir: {batch_entry.destination_path}")
+    return batch_entries
+
+
+def copy_template(template_dir_path: Path, destination_path: Path, excluded_paths: List[Path] = []) -> None:
+    # Excluded paths (e.g. the destinations of a batch) are never copied, wherever they are
+    if destination_path.exists():
+        raise RuntimeError(f"Destination already exists: {destination_path}")
+    resolved_excluded_paths = {path.resolve() for path in excluded_paths + [destination_path]}
+
+    def ignore_excluded_dirs(dir_path: str, names: List[str]) -> List[str]:
+        is_template_dir = Path(dir_path) == template_dir_path
+        return [name for name in names if (is_template_dir and name in EXCLUDED_TEMPLATE_DIRS) or (Path(dir_path) / name).resolve() in resolved_excluded_paths]
+
+    logm.info("Copying template to: %s", destination_path)
+    shutil.copytree(template_dir_path, destination_path, symlinks=True, ignore=ignore_excluded_dirs)
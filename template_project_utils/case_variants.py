@@ -0,0 +1,80 @@
+# Copyright (C) 2024 twyleg
+import re
+from enum import Enum
+from typing import Any, Dict, List
+
+
+WORD_SEPARATOR_PATTERN = re.compile(r"[\s_\-]+")
+
+
+class CaseVariant(Enum):
+    SNAKE = "snake"
+    KEBAB = "kebab"
+    CAMEL = "camel"
+    LOWER_CAMEL = "lower_camel"
+    UPPER = "upper"
+
+
+def _split_camel_case(chunk: str) -> List[str]:
+    # Words start at an uppercase letter following a lowercase letter or digit ("myProject") and at the last uppercase
+    # letter of an acronym followed by a lowercase letter ("HTTPServer"). All other characters (any letters, digits,
+    # dots, ...) stay part of their word, so nothing of the name is lost.
+    words: List[str] = []
+    start = 0
+    for i in range(1, len(chunk)):
+        previous_char, char, next_char = chunk[i - 1], chunk[i], chunk[i + 1 : i + 2]
+        if char.isupper() and (previous_char.islower() or previous_char.isdigit() or (previous_char.isupper() and next_char.islower())):
+            words.append(chunk[start:i])
+            start = i
+    words.append(chunk[start:])
+    return words
+
+
+def split_words(name: str) -> List[str]:
+    return [word.lower() for chunk in WORD_SEPARATOR_PATTERN.split(name) if chunk for word in _split_camel_case(chunk)]
+
+
+def to_case_variant(name: str, case_variant: CaseVariant) -> str:
+    words = split_words(name)
+    if case_variant == CaseVariant.SNAKE:
+        return "_".join(words)
+    elif case_variant == CaseVariant.KEBAB:
+        return "-".join(words)
+    elif case_variant == CaseVariant.CAMEL:
+        return "".join(word.capitalize() for word in words)
+    elif case_variant == CaseVariant.LOWER_CAMEL:
+        return "".join(word.capitalize() if i else word for i, word in enumerate(words))
+    return "_".join(words).upper()
+
+
+class PlaceholderVariants:
+    # Placeholders of the config, each either a plain name or a name with the case variants (snake, kebab, ...) it also
+    # appears in. Targets are only asked for the declared names. The variants are derived from them and all placeholder
+    # target pairs end up in the same substitution and keyword matcher, so each file is still read and matched once.
+
+    def __init__(self, placeholder_config: List[str | Dict[str, Any]]) -> None:
+        self.variants: Dict[str, List[CaseVariant]] = {}
+        for entry in placeholder_config:
+            if isinstance(entry, str):
+                self.variants[entry] = []
+            else:
+                self.variants[entry["name"]] = [CaseVariant(case_variant) for case_variant in entry["variants"]]
+
+        self.placeholders: Dict[str, str] = {}
+        for name, case_variants in self.variants.items():
+            for placeholder in [name] + [to_case_variant(name, case_variant) for case_variant in case_variants]:
+                if self.placeholders.setdefault(placeholder, name) != name:
+                    raise RuntimeError(f'Placeholder "{placeholder}" is derived from both "{self.placeholders[placeholder]}" and "{name}"')
+
+    def names(self) -> List[str]:
+        return list(self.variants.keys())
+
+    def expand(self, name_target_dict: Dict[str, str]) -> Dict[str, str]:
+        # Variants are replaced by the same variant of the target. The declared name, unless it is one of its own
+        # variants (e.g. a snake case name with the snake variant), is replaced by the target as it was given.
+        placeholder_target_dict: Dict[str, str] = {}
+        for name, target in name_target_dict.items():
+            for case_variant in self.variants.get(name, []):
+                placeholder_target_dict[to_case_variant(name, case_variant)] = to_case_variant(target, case_variant)
+            placeholder_target_dict.setdefault(name, target)
+        return placeholder_target_dict
@@ -0,0 +1,133 @@
+# Copyright (C) 2024 twyleg
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Dict, List, Set, Type
+
+
+logm = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR | IN_DONT_FOLLOW
+
+EVENT_HEADER = struct.Struct("iIII")
+
+# Events following within this time are collected into the same batch, so a save touching several files
+# (or writing a file in several steps) results in a single update
+DEFAULT_SETTLE_TIME = 0.005
+
+
+class InotifyWatcher:
+    # Watches all dirs below the root dir (except the excluded ones at the top level) with inotify and reports
+    # changed paths relative to it. Dirs created or moved into the tree are watched as they show up.
+
+    def __init__(self, root_dir_path: Path, excluded_dirs: List[str], settle_time: float = DEFAULT_SETTLE_TIME) -> None:
+        if not sys.platform.startswith("linux"):
+            raise RuntimeError("Watching for file changes is only supported on Linux")
+        self.root_dir_path = root_dir_path
+        self.excluded_dirs = excluded_dirs
+        self.settle_time = settle_time
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self._watched_dirs: Dict[int, str] = {}
+        self._add_watches("")
+
+    def _add_watch(self, relative_dir_path: str) -> bool:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(os.path.join(self.root_dir_path, relative_dir_path)), WATCH_MASK)
+        if wd < 0:
+            # Removed again before it could be watched, its deletion is reported by the parent dir
+            logm.debug("Unable to watch dir %s: %s", relative_dir_path, os.strerror(ctypes.get_errno()))
+            return False
+        self._watched_dirs[wd] = relative_dir_path
+        return True
+
+    def _add_watches(self, relative_dir_path: str) -> None:
+        dirs_to_watch = [relative_dir_path]
+        while dirs_to_watch:
+            relative_dir_path = dirs_to_watch.pop()
+            if not self._add_watch(relative_dir_path):
+                continue
+            try:
+                with os.scandir(os.path.join(self.root_dir_path, relative_dir_path)) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False) and (relative_dir_path or entry.name not in self.excluded_dirs):
+                            dirs_to_watch.append(f"{relative_dir_path}/{entry.name}" if relative_dir_path else entry.name)
+            except OSError:
+                continue
+
+    def _remove_watches(self, relative_dir_path: str) -> None:
+        for wd, watched_dir in list(self._watched_dirs.items()):
+            if watched_dir == relative_dir_path or watched_dir.startswith(relative_dir_path + "/"):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watched_dirs[wd]
+
+    def _read_events(self, changed_paths: Set[str]) -> bool:
+        data = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size : offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                return False
+            if mask & IN_IGNORED:
+                self._watched_dirs.pop(wd, None)
+                continue
+            relative_dir_path = self._watched_dirs.get(wd)
+            if relative_dir_path is None or not name:
+                continue
+            decoded_name = os.fsdecode(name)
+            if not relative_dir_path and decoded_name in self.excluded_dirs:
+                continue
+            relative_path = f"{relative_dir_path}/{decoded_name}" if relative_dir_path else decoded_name
+            changed_paths.add(relative_path)
+            if mask & IN_ISDIR:
+                if mask & IN_MOVED_FROM:
+                    self._remove_watches(relative_path)
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_watches(relative_path)
+        return True
+
+    def read_changes(self, timeout: float | None = None) -> Set[str] | None:
+        # Blocks until something changed and returns the changed paths, an empty set after timeout seconds without
+        # changes or None if events were lost (queue overflow), so the caller has to rescan everything
+        changed_paths: Set[str] = set()
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return changed_paths
+        settle_deadline = time.monotonic() + self.settle_time
+        while True:
+            if not self._read_events(changed_paths):
+                return None
+            remaining_time = settle_deadline - time.monotonic()
+            if remaining_time <= 0 or not select.select([self._fd], [], [], remaining_time)[0]:
+                return changed_paths
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def __enter__(self) -> "InotifyWatcher":
+        return self
+
+    def __exit__(self, exc_type: Type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None) -> None:
+        self.close()
@@ -3,6 +3,7 @@ import pygit2
 import logging
 
 from pathlib import Path
+from typing import List
 
 from pygit2 import GitError
 
@@ -23,3 +24,16 @@ def remove_remote(project_dir_path: Path, name: str) -> None:
             logging.warning("Unable to remove remote '%s' due to non-existence", name)
     except GitError:
         logging.warning('Unable to find git repo in dir "%s"', project_dir_path)
+
+
+def list_tracked_files(project_dir_path: Path) -> List[str] | None:
+    # Paths of all files in the index below the project dir, relative to it. Submodules are left out.
+    try:
+        repo = pygit2.Repository(str(project_dir_path))
+    except GitError:
+        logging.warning('Unable to find git repo in dir "%s"', project_dir_path)
+        return None
+
+    relative_project_dir_path = project_dir_path.resolve().relative_to(Path(repo.workdir).resolve()).as_posix()
+    prefix = "" if relative_project_dir_path == "." else relative_project_dir_path + "/"
+    return [entry.path[len(prefix) :] for entry in repo.index if entry.path.startswith(prefix) and entry.mode != pygit2.GIT_FILEMODE_COMMIT]
@@ -0,0 +1,62 @@
+# Copyright (C) 2024 twyleg
+import re
+from typing import AnyStr, Dict, Generic, Iterator, List, Set, Tuple
+
+
+class KeywordMatcher(Generic[AnyStr]):
+
+    def __init__(self, keywords: List[AnyStr]) -> None:
+        self.keywords: List[AnyStr] = list(dict.fromkeys(keywords))
+
+        # Every keyword occurrence starting at a position is a prefix of the longest one starting there. So one match
+        # of the longest-first alternation per start position plus the table of keyword prefixes yields all occurrences,
+        # like the output function of an Aho-Corasick automaton, while the scanning itself stays in the regex engine.
+        longest_first = sorted(self.keywords, key=lambda keyword: -len(keyword))
+        self.prefixes: Dict[AnyStr, List[AnyStr]] = {keyword: [prefix for prefix in self.keywords if keyword.startswith(prefix)] for keyword in self.keywords}
+        # Without keywords there is no pattern at all, an empty one would be of either type and match everywhere
+        self.pattern: re.Pattern[AnyStr] | None = None
+        if longest_first:
+            alternation = [re.escape(keyword) for keyword in longest_first]
+            separator = b"|" if isinstance(longest_first[0], bytes) else "|"
+            self.pattern = re.compile(separator.join(alternation))  # type: ignore[attr-defined]
+
+    def _finditer_all_starts(self, data: AnyStr) -> Iterator[re.Match[AnyStr]]:
+        # Searching again right after the start of the previous match finds keywords that start inside of it
+        if self.pattern is None:
+            return
+        match = self.pattern.search(data)
+        while match:
+            yield match
+            match = self.pattern.search(data, match.start() + 1)
+
+    def iter_occurrences(self, data: AnyStr, code_unit_size: int = 1, offset: int = 0) -> Iterator[Tuple[int, AnyStr]]:
+        # All occurrences of all keywords by start position, including overlapping ones. Matches not on a code unit
+        # boundary are ignored.
+        if not self.keywords:
+            return
+        for match in self._finditer_all_starts(data):
+            start = match.start()
+            if (start - offset) % code_unit_size == 0:
+                for keyword in self.prefixes[match.group()]:
+                    yield start, keyword
+
+    def count(self, data: AnyStr, code_unit_size: int = 1, offset: int = 0) -> Dict[AnyStr, int]:
+        # Occurrences of the same keyword are counted without overlap (like str.count()), occurrences of
+        # different keywords are counted independently.
+        count_dict: Dict[AnyStr, int] = dict.fromkeys(self.keywords, 0)
+        if not self.keywords:
+            return count_dict
+        ends: Dict[AnyStr, int] = {}
+        for start, keyword in self.iter_occurrences(data, code_unit_size, offset):
+            if start >= ends.get(keyword, 0):
+                count_dict[keyword] += 1
+                ends[keyword] = start + len(keyword)
+        return count_dict
+
+    def matches(self, data: AnyStr) -> Set[AnyStr]:
+        matched: Set[AnyStr] = set()
+        if not self.keywords:
+            return matched
+        for match in self._finditer_all_starts(data):
+            matched.update(self.prefixes[match.group()])
+        return matched
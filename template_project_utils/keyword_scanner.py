@@ -1,15 +1,55 @@
 # Copyright (C) 2024 twyleg
+import asyncio
+import contextlib
+import copy
 import logging
+import mmap
+import os
+import template_project_utils.git as git
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import Enum
 from pathlib import Path
-from typing import List, Dict
+from typing import Any, ContextManager, Generator, Iterable, Iterator, List, Dict, NamedTuple, Set, Tuple, cast
+
+from template_project_utils.file_watcher import InotifyWatcher
+from template_project_utils.keyword_matcher import KeywordMatcher
+from template_project_utils.match_index import FileMatches
+from template_project_utils.operation_plan import OperationPlan
+from template_project_utils.path_patterns import DEFAULT_EXCLUDED_DIRS
+from template_project_utils.scan_cache import ScanCache
+from template_project_utils.scan_output import NdjsonScanOutput
+from template_project_utils.text_encoding import MAX_BOM_LENGTH, SNIFF_SIZE, EncodedKeywords, detect_encoding, has_binary_extension, is_binary
 
 
 FILE_DIR = Path(__file__).parent
 
 logm = logging.getLogger(__name__)
 
+DEFAULT_MMAP_THRESHOLD = 16 * 1024 * 1024
+
+# Files submitted to the scan pool per job before the oldest results are merged
+PARALLEL_SCAN_WINDOW = 64
+
 
 class KeywordScanner:
+    class SkipReason(Enum):
+        BINARY = "binary"
+        TOO_LARGE = "too_large"
+
+    class MatchType(Enum):
+        DIR_NAME = "dir_name"
+        FILE_NAME = "file_name"
+        FILE_CONTENT = "content"
+        # Contents not checked due to the size limit, which might contain any keyword
+        UNCHECKED_CONTENT = "unchecked_content"
+
+    class Match(NamedTuple):
+        type: "KeywordScanner.MatchType"
+        path: str
+        keyword: str
+        occurrences: int
+
     class ScanResults:
 
         @classmethod
@@ -21,12 +61,39 @@ class KeywordScanner:
             self.dir_name_count: Dict[str, int] = self.create_empty_keyword_count_dict(keywords)
             self.file_content_count: Dict[str, int] = self.create_empty_keyword_count_dict(keywords)
 
+            # Paths relative to the scan base dir (POSIX style, like the paths in the template config)
+            self.files_with_keyword_in_name: List[str] = []
+            self.dirs_with_keyword_in_name: List[str] = []
+            self.files_with_keyword_in_content: List[str] = []
+
+            # Offsets, lines and columns of all keyword matches of every file listed in files_with_keyword_in_content
+            self.file_matches: Dict[str, FileMatches] = {}
+
+            # Files whose contents were not scanned, because they were detected as binary or exceed the size limit
+            self.skipped_binary_files: List[str] = []
+            self.skipped_large_files: List[str] = []
+
         def empty(self) -> bool:
             file_name_count = sum(list(self.file_name_count.values()))
             dir_name_count = sum(list(self.dir_name_count.values()))
             file_content_count = sum(list(self.file_content_count.values()))
             return file_name_count == 0 and dir_name_count == 0 and file_content_count == 0
 
+        def to_dict(self) -> Dict[str, Any]:
+            scan_results_dict = dict(vars(self))
+            scan_results_dict["file_matches"] = {path: file_matches.to_dict() for path, file_matches in self.file_matches.items()}
+            return scan_results_dict
+
+        @classmethod
+        def from_dict(cls, scan_results_dict: Dict[str, Any], keywords: List[str]) -> "KeywordScanner.ScanResults":
+            scan_results = cls(keywords)
+            for name in vars(scan_results):
+                setattr(scan_results, name, scan_results_dict[name])
+            scan_results.file_matches = {
+                path: FileMatches.from_dict(file_matches_dict, keywords) for path, file_matches_dict in scan_results_dict["file_matches"].items()
+            }
+            return scan_results
+
         def log(self) -> None:
             logging.debug(" - File names:")
             for keyword, count in self.file_name_count.items():
@@ -37,41 +104,420 @@ class KeywordScanner:
             logging.debug(" - File contents:")
             for keyword, count in self.file_content_count.items():
                 logging.debug("     %s : %d", keyword, count)
+            logging.debug(" - Skipped binary files: %d", len(self.skipped_binary_files))
+            if self.skipped_large_files:
+                logging.warning("Files not scanned for placeholders, because they exceed the maximum scan file size:")
+                for skipped_large_file in self.skipped_large_files:
+                    logging.warning("  %s", skipped_large_file)
 
-    def __init__(self, scan_base_dir_path: Path, keywords: List[str]):
+    def __init__(
+        self,
+        scan_base_dir_path: Path,
+        keywords: List[str],
+        jobs: int = 1,
+        max_file_size: int | None = None,
+        mmap_threshold: int = DEFAULT_MMAP_THRESHOLD,
+        git_tracked: bool = False,
+        scan_cache_file_path: Path | None = None,
+        scan_output: NdjsonScanOutput | None = None,
+    ):
         self.scan_base_dir_path = scan_base_dir_path
+        self.max_file_size = max_file_size
+        self.mmap_threshold = mmap_threshold
+        self.git_tracked = git_tracked
+        self.index_renames: List[Tuple[str, str]] = []
+        self.scan_cache_file_path = scan_cache_file_path
+        self.scan_output = scan_output
         self.keywords = keywords
+        self.encoded_keywords = EncodedKeywords(keywords)
+        self.name_keyword_matcher = KeywordMatcher(keywords)
+        self.jobs = jobs
+
+        if self.jobs < 1:
+            raise RuntimeError(f"Invalid number of jobs: {self.jobs}")
+
+    def settings(self) -> Dict[str, Any]:
+        # Everything besides the keywords that the results of a scan depend on
+        return {
+            "max_file_size": self.max_file_size,
+            "mmap_threshold": self.mmap_threshold,
+            "git_tracked": self.git_tracked,
+            "excluded_dirs": DEFAULT_EXCLUDED_DIRS,
+        }
+
+    def with_base_dir(self, scan_base_dir_path: Path) -> "KeywordScanner":
+        # Same settings and compiled matchers for another dir, e.g. a copy of the scanned template
+        keyword_scanner = copy.copy(self)
+        keyword_scanner.scan_base_dir_path = scan_base_dir_path
+        return keyword_scanner
+
+    def with_index_renames(self, index_renames: List[Tuple[str, str]]) -> "KeywordScanner":
+        # Paths renamed after the git index was read (e.g. by an executed plan) are scanned under their new names
+        keyword_scanner = copy.copy(self)
+        keyword_scanner.index_renames = index_renames
+        return keyword_scanner
+
+    def _add_name(self, scan_results: ScanResults, relative_path: str, is_dir: bool) -> None:
+        name = relative_path.rsplit("/", 1)[-1]
+        matched_keywords = self.name_keyword_matcher.matches(name)
+        if not matched_keywords:
+            return
+        name_count = scan_results.dir_name_count if is_dir else scan_results.file_name_count
+        for keyword in self.keywords:
+            if keyword in matched_keywords:
+                name_count[keyword] += 1
+                logm.debug("%s path containing keyword '%s': %s", "Dir" if is_dir else "File", keyword, relative_path)
+        (scan_results.dirs_with_keyword_in_name if is_dir else scan_results.files_with_keyword_in_name).append(relative_path)
+        if self.scan_output:
+            self.scan_output.name_match(relative_path, is_dir, [keyword for keyword in self.keywords if keyword in matched_keywords])
+
+    def _add_content(self, scan_results: ScanResults, relative_path: str, file_matches: FileMatches | SkipReason) -> None:
+        if isinstance(file_matches, KeywordScanner.SkipReason):
+            self._add_skipped(scan_results, relative_path, file_matches)
+            return
+        if not file_matches:
+            return
+        for keyword, count in file_matches.count().items():
+            scan_results.file_content_count[keyword] += count
+            if count:
+                logm.debug("File containing keyword '%s': %s", keyword, relative_path)
+        scan_results.files_with_keyword_in_content.append(relative_path)
+        scan_results.file_matches[relative_path] = file_matches
+        if self.scan_output:
+            self.scan_output.content_match(relative_path, file_matches)
+
+    def _add_skipped(self, scan_results: ScanResults, relative_path: str, skip_reason: SkipReason) -> None:
+        if skip_reason == KeywordScanner.SkipReason.BINARY:
+            scan_results.skipped_binary_files.append(relative_path)
+        else:
+            scan_results.skipped_large_files.append(relative_path)
+        if self.scan_output:
+            self.scan_output.skipped(relative_path, skip_reason.value)
+
+    def _finish(self, scan_results: ScanResults) -> ScanResults:
+        if self.scan_output:
+            self.scan_output.summary(
+                scan_results.file_name_count,
+                scan_results.dir_name_count,
+                scan_results.file_content_count,
+                len(scan_results.skipped_binary_files),
+                len(scan_results.skipped_large_files),
+                scan_results.empty(),
+            )
+        return scan_results
+
+    def _count_content(self, path: Path) -> FileMatches | SkipReason:
+        # Binaries are recognized by their extension or their first bytes, so they cost a single small read at most
+        if has_binary_extension(path.name):
+            return KeywordScanner.SkipReason.BINARY
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if self.max_file_size is not None and size > self.max_file_size:
+                return KeywordScanner.SkipReason.TOO_LARGE
+            head = file.read(SNIFF_SIZE)
+            encoding, bom_length = detect_encoding(head[:MAX_BOM_LENGTH])
+            if is_binary(head, encoding):
+                return KeywordScanner.SkipReason.BINARY
+            if size > self.mmap_threshold:
+                # Large files are matched in place, memory usage is independent of the file size
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    return self.encoded_keywords.find(cast(bytes, buffer), encoding, bom_length)
+            content = head + file.read()
+        return self.encoded_keywords.find(content, encoding, bom_length)
+
+    def _walk(self, relative_dir_path: str = "") -> Iterator[Tuple[str, str, bool]]:
+        # Excluded dirs are pruned before descending and the entry types come from the dir listing,
+        # so neither the content of .git/venv/logs nor extra stat calls are paid for.
+        dirs_to_walk: List[Tuple[str, str]] = [(os.path.join(self.scan_base_dir_path, relative_dir_path), relative_dir_path + "/" if relative_dir_path else "")]
+        while dirs_to_walk:
+            dir_path, prefix = dirs_to_walk.pop()
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if not prefix and entry.name in DEFAULT_EXCLUDED_DIRS:
+                        continue
+                    relative_path = prefix + entry.name
+                    if entry.is_dir():
+                        yield relative_path, entry.path, True
+                        if not entry.is_symlink():
+                            dirs_to_walk.append((entry.path, relative_path + "/"))
+                    elif entry.is_file():
+                        yield relative_path, entry.path, False
+
+    def _walk_git_index(self, tracked_files: List[str]) -> Iterator[Tuple[str, str, bool]]:
+        # Only tracked files and the dirs containing them are visited, so build outputs and untracked files are
+        # ignored without walking them. Files deleted from the working tree, but still in the index, are skipped.
+        visited_dirs: Set[str] = set()
+        for tracked_file in tracked_files:
+            parts = tracked_file.split("/")
+            if parts[0] in DEFAULT_EXCLUDED_DIRS:
+                continue
+            for i in range(1, len(parts)):
+                relative_dir_path = "/".join(parts[:i])
+                if relative_dir_path not in visited_dirs:
+                    visited_dirs.add(relative_dir_path)
+                    dir_path = os.path.join(self.scan_base_dir_path, relative_dir_path)
+                    if os.path.isdir(dir_path):
+                        yield relative_dir_path, dir_path, True
+            path = os.path.join(self.scan_base_dir_path, tracked_file)
+            if os.path.isfile(path):
+                yield tracked_file, path, False
+
+    def _walk_selected(self) -> Iterator[Tuple[str, str, bool]]:
+        if self.git_tracked:
+            tracked_files = git.list_tracked_files(self.scan_base_dir_path)
+            if tracked_files is not None:
+                return self._walk_git_index([self._map_path(tracked_file, self.index_renames) for tracked_file in tracked_files])
+            logm.warning("Scanning all files instead of the tracked ones")
+        return self._walk()
+
+    def list_files(self) -> List[str]:
+        return [relative_path for relative_path, _, is_dir in self._walk_selected() if not is_dir]
+
+    def _open_scan_cache(self) -> ContextManager[ScanCache | None]:
+        if self.scan_cache_file_path:
+            return ScanCache(self.scan_cache_file_path, self.keywords)
+        return contextlib.nullcontext()
+
+    def _get_cached_content(self, scan_cache: ScanCache | None, path: str) -> Tuple[os.stat_result | None, FileMatches | SkipReason | None]:
+        if scan_cache is None:
+            return None, None
+        # The stat happens before the file is read, so a file changed in between is a cache miss next time
+        stat_result = os.stat(path)
+        if self.max_file_size is not None and stat_result.st_size > self.max_file_size:
+            return stat_result, KeywordScanner.SkipReason.TOO_LARGE
+        cached = scan_cache.get(os.path.abspath(path), stat_result)
+        return stat_result, KeywordScanner.SkipReason.BINARY if isinstance(cached, str) else cached
+
+    def _put_cached_content(self, scan_cache: ScanCache | None, path: str, stat_result: os.stat_result | None, file_matches: FileMatches | SkipReason) -> None:
+        if scan_cache is None or stat_result is None or file_matches == KeywordScanner.SkipReason.TOO_LARGE:
+            return
+        scan_cache.put(os.path.abspath(path), stat_result, file_matches if isinstance(file_matches, FileMatches) else ScanCache.BINARY)
+
+    def _iter_scanned(self, scan_cache: ScanCache | None) -> Iterator[Tuple[str, bool, FileMatches | SkipReason | None]]:
+        # Yields every walked path once without contents (for the name check) and every file once more with its
+        # contents, lazily, so consumers can stop at any point without the rest of the tree being read.
+        for relative_path, path, is_dir in self._walk_selected():
+            yield relative_path, is_dir, None
+            if not is_dir:
+                stat_result, file_matches = self._get_cached_content(scan_cache, path)
+                if file_matches is None:
+                    file_matches = self._count_content(Path(path))
+                    self._put_cached_content(scan_cache, path, stat_result, file_matches)
+                yield relative_path, is_dir, file_matches
+
+    def _iter_scanned_parallel(self, scan_cache: ScanCache | None) -> Iterator[Tuple[str, bool, FileMatches | SkipReason | None]]:
+        content_results: deque[Tuple[str, str, os.stat_result | None, Future | FileMatches | KeywordScanner.SkipReason]] = deque()
+
+        def merge_oldest() -> Tuple[str, bool, FileMatches | KeywordScanner.SkipReason]:
+            relative_path, path, stat_result, content_result = content_results.popleft()
+            if isinstance(content_result, Future):
+                file_matches = content_result.result()
+                self._put_cached_content(scan_cache, path, stat_result, file_matches)
+            else:
+                file_matches = content_result
+            return relative_path, False, file_matches
+
+        # The walk produces the work while the pool reads and counts the contents. Only the consuming thread touches
+        # the results and the cache, merging them in walk order, so they are identical to those of the serial scan.
+        # Results are merged as soon as the window of pending files is full, so they are reported while the walk goes on.
+        executor = ThreadPoolExecutor(max_workers=self.jobs)
+        try:
+            for relative_path, path, is_dir in self._walk_selected():
+                yield relative_path, is_dir, None
+                if not is_dir:
+                    stat_result, cached = self._get_cached_content(scan_cache, path)
+                    content_results.append(
+                        (relative_path, path, stat_result, cached if cached is not None else executor.submit(self._count_content, Path(path)))
+                    )
+                    if len(content_results) > self.jobs * PARALLEL_SCAN_WINDOW:
+                        yield merge_oldest()
+            while content_results:
+                yield merge_oldest()
+        finally:
+            # Files still pending when the consumer stops early are not read anymore
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _iter_selected_scanned(self, scan_cache: ScanCache | None) -> Iterator[Tuple[str, bool, FileMatches | SkipReason | None]]:
+        return self._iter_scanned_parallel(scan_cache) if self.jobs > 1 else self._iter_scanned(scan_cache)
 
     def scan(self) -> ScanResults:
         scan_results = KeywordScanner.ScanResults(self.keywords)
+        with self._open_scan_cache() as scan_cache:
+            for relative_path, is_dir, file_matches in self._iter_selected_scanned(scan_cache):
+                if file_matches is None:
+                    self._add_name(scan_results, relative_path, is_dir)
+                else:
+                    self._add_content(scan_results, relative_path, file_matches)
+        return self._finish(scan_results)
 
-        for path in self.scan_base_dir_path.rglob("*"):
-            if path.is_relative_to(self.scan_base_dir_path / ".git/"):
-                pass  # Ignore
-            elif path.is_relative_to(self.scan_base_dir_path / "venv/"):
-                pass  # Ignore
-            elif path.is_relative_to(self.scan_base_dir_path / "logs/"):
-                pass  # Ignore
-            elif path.is_dir():
-                for keyword in self.keywords:
-                    relative_path = path.relative_to(self.scan_base_dir_path)
-                    if keyword in relative_path.name:
-                        scan_results.dir_name_count[keyword] += 1
-                        logm.debug("Dir path containing keyword '%s': %s", keyword, path)
-            elif path.is_file():
-                relative_path = path.relative_to(self.scan_base_dir_path)
-                for keyword in self.keywords:
-                    if keyword in relative_path.name:
-                        scan_results.file_name_count[keyword] += 1
-                        logm.debug("File path containing keyword '%s': %s", keyword, path)
-
-                try:
-                    content = path.read_text()
+    def iter_matches(self) -> Generator[Match, None, None]:
+        # Keyword matches one by one while the tree is scanned, without collecting any results
+        with self._open_scan_cache() as scan_cache:
+            for relative_path, is_dir, file_matches in self._iter_selected_scanned(scan_cache):
+                if file_matches is None:
+                    matched_keywords = self.name_keyword_matcher.matches(relative_path.rsplit("/", 1)[-1])
+                    match_type = KeywordScanner.MatchType.DIR_NAME if is_dir else KeywordScanner.MatchType.FILE_NAME
                     for keyword in self.keywords:
-                        count = content.count(keyword)
-                        scan_results.file_content_count[keyword] += count
+                        if keyword in matched_keywords:
+                            yield KeywordScanner.Match(match_type, relative_path, keyword, 1)
+                elif isinstance(file_matches, FileMatches) and file_matches:
+                    for keyword, count in file_matches.count().items():
                         if count:
-                            logm.debug("File containing keyword '%s': %s", keyword, path)
-                except UnicodeDecodeError as e:
-                    pass
-        return scan_results
+                            yield KeywordScanner.Match(KeywordScanner.MatchType.FILE_CONTENT, relative_path, keyword, count)
+                elif file_matches == KeywordScanner.SkipReason.TOO_LARGE:
+                    yield KeywordScanner.Match(KeywordScanner.MatchType.UNCHECKED_CONTENT, relative_path, "", 0)
+
+    def any_match(self) -> Match | None:
+        # The first match found, the scan stops right there. None if there are no matches at all.
+        with contextlib.closing(self.iter_matches()) as matches:
+            return next(matches, None)
+
+    @classmethod
+    def _map_path(cls, path: str, renames: List[Tuple[str, str]]) -> str:
+        for src, dst in renames:
+            if path == src or path.startswith(src + "/"):
+                path = dst + path[len(src) :]
+        return path
+
+    def scan_incremental(self, previous_scan_results: ScanResults, executed_plan: OperationPlan) -> ScanResults:
+        # The results of the previous scan are carried over and only the paths touched by the plan are checked
+        # again: names of renamed paths are recomputed and rewritten files are rescanned. Everything else is
+        # known to be unchanged, so the results are the same as those of a full scan.
+        rename_operations = [
+            operation
+            for operation in executed_plan.operations
+            if operation.type in (OperationPlan.OperationType.RENAME_FILE, OperationPlan.OperationType.RENAME_DIR) and operation.target_path
+        ]
+        renames: List[Tuple[str, str]] = [(operation.path.rstrip("/"), str(operation.target_path).rstrip("/")) for operation in rename_operations]
+        removed_paths = [
+            operation.path.rstrip("/")
+            for operation in executed_plan.operations
+            if operation.type in (OperationPlan.OperationType.REMOVE_FILE, OperationPlan.OperationType.REMOVE_DIR)
+        ]
+        updated_files = {operation.path: None for operation in executed_plan.operations_of_type(OperationPlan.OperationType.UPDATE_FILE)}
+
+        def is_removed(path: str) -> bool:
+            return any(path == removed_path or path.startswith(removed_path + "/") for removed_path in removed_paths)
+
+        def map_paths(previous_paths: List[str], rename_type: OperationPlan.OperationType) -> List[str]:
+            # Rename targets are mapped through all renames that were executed after them (e.g. files in renamed dirs)
+            rename_targets = [self._map_path(renames[i][1], renames[i + 1 :]) for i, operation in enumerate(rename_operations) if operation.type == rename_type]
+            mapped_paths = dict.fromkeys(self._map_path(path, renames) for path in previous_paths)
+            mapped_paths.update(dict.fromkeys(rename_targets))
+            return [path for path in mapped_paths.keys() if not is_removed(path)]
+
+        scan_results = KeywordScanner.ScanResults(self.keywords)
+        for relative_path in map_paths(previous_scan_results.dirs_with_keyword_in_name, OperationPlan.OperationType.RENAME_DIR):
+            self._add_name(scan_results, relative_path, is_dir=True)
+        for relative_path in map_paths(previous_scan_results.files_with_keyword_in_name, OperationPlan.OperationType.RENAME_FILE):
+            self._add_name(scan_results, relative_path, is_dir=False)
+
+        for previous_path in dict.fromkeys(
+            previous_scan_results.files_with_keyword_in_content + previous_scan_results.skipped_binary_files + list(updated_files)
+        ):
+            relative_path = self._map_path(previous_path, renames)
+            if is_removed(relative_path):
+                continue
+            if previous_path in updated_files:
+                file_matches = self._count_content(self.scan_base_dir_path / relative_path)
+            else:
+                file_matches = previous_scan_results.file_matches.get(previous_path, KeywordScanner.SkipReason.BINARY)
+            self._add_content(scan_results, relative_path, file_matches)
+        for previous_path in previous_scan_results.skipped_large_files:
+            relative_path = self._map_path(previous_path, renames)
+            if not is_removed(relative_path) and previous_path not in updated_files:
+                self._add_skipped(scan_results, relative_path, KeywordScanner.SkipReason.TOO_LARGE)
+        return self._finish(scan_results)
+
+    def _remove_path(self, scan_results: ScanResults, relative_path: str) -> None:
+        def is_affected(path: str) -> bool:
+            return path == relative_path or path.startswith(relative_path + "/")
+
+        removed_paths: Set[str] = set()
+        for paths, name_count in (
+            (scan_results.dirs_with_keyword_in_name, scan_results.dir_name_count),
+            (scan_results.files_with_keyword_in_name, scan_results.file_name_count),
+        ):
+            for path in [path for path in paths if is_affected(path)]:
+                paths.remove(path)
+                removed_paths.add(path)
+                for keyword in self.name_keyword_matcher.matches(path.rsplit("/", 1)[-1]):
+                    name_count[keyword] -= 1
+        for path in [path for path in scan_results.files_with_keyword_in_content if is_affected(path)]:
+            scan_results.files_with_keyword_in_content.remove(path)
+            removed_paths.add(path)
+            for keyword, count in scan_results.file_matches.pop(path).count().items():
+                scan_results.file_content_count[keyword] -= count
+        for skipped_files in (scan_results.skipped_binary_files, scan_results.skipped_large_files):
+            removed_paths.update(path for path in skipped_files if is_affected(path))
+            skipped_files[:] = [path for path in skipped_files if not is_affected(path)]
+        if self.scan_output:
+            for path in sorted(removed_paths):
+                self.scan_output.removed(path)
+
+    def _add_file(self, scan_results: ScanResults, relative_path: str, path: str) -> None:
+        self._add_name(scan_results, relative_path, is_dir=False)
+        try:
+            file_matches = self._count_content(Path(path))
+        except OSError as e:
+            # Deleted or replaced while reading, the event for that change follows
+            logm.debug("Unable to scan file %s: %s", relative_path, e)
+            return
+        self._add_content(scan_results, relative_path, file_matches)
+
+    def _walk_selected_below(self, relative_path: str, tracked_files: List[str] | None) -> Iterator[Tuple[str, str, bool]]:
+        # Like _walk_selected, but only the path itself and everything below it
+        def is_affected(path: str) -> bool:
+            return path == relative_path or path.startswith(relative_path + "/")
+
+        if tracked_files is not None:
+            for entry in self._walk_git_index([tracked_file for tracked_file in tracked_files if is_affected(tracked_file)]):
+                if is_affected(entry[0]):
+                    yield entry
+            return
+        path = os.path.join(self.scan_base_dir_path, relative_path)
+        if os.path.isdir(path):
+            yield relative_path, path, True
+            if os.path.islink(path):
+                return
+            try:
+                yield from self._walk(relative_path)
+            except OSError as e:
+                # Deleted or replaced while walking, the event for that change follows
+                logm.debug("Unable to walk dir %s: %s", relative_path, e)
+        elif os.path.isfile(path):
+            yield relative_path, path, False
+
+    def update_paths(self, scan_results: ScanResults, relative_paths: Iterable[str]) -> ScanResults:
+        # Brings the results of a previous scan up to date after the given paths were created, modified or deleted
+        # (moves are a deletion plus a creation). Everything at or below a path is dropped and scanned again if it exists
+        # and would be scanned by a full scan too (e.g. only tracked files if the scan is limited to them).
+        tracked_files = git.list_tracked_files(self.scan_base_dir_path) if self.git_tracked else None
+        for relative_path in sorted(set(relative_paths)):
+            self._remove_path(scan_results, relative_path)
+            if relative_path.split("/", 1)[0] in DEFAULT_EXCLUDED_DIRS:
+                continue
+            for walked_relative_path, walked_path, is_dir in self._walk_selected_below(relative_path, tracked_files):
+                if is_dir:
+                    self._add_name(scan_results, walked_relative_path, is_dir=True)
+                else:
+                    self._add_file(scan_results, walked_relative_path, walked_path)
+        return self._finish(scan_results)
+
+    def watch(self, scan_results: ScanResults, timeout: float | None = None) -> Iterator[ScanResults]:
+        # Keeps the results of a previous scan up to date by inotify events (Linux only) and yields them after each
+        # batch of changes. A full rescan is done if the kernel dropped events. Stops after timeout seconds without changes.
+        with InotifyWatcher(self.scan_base_dir_path, DEFAULT_EXCLUDED_DIRS) as watcher:
+            while True:
+                changed_paths = watcher.read_changes(timeout)
+                if changed_paths is None:
+                    logm.warning("File system events were lost, rescanning")
+                    scan_results = self.scan()
+                elif changed_paths:
+                    scan_results = self.update_paths(scan_results, changed_paths)
+                else:
+                    return
+                yield scan_results
+
+    async def ascan(self) -> ScanResults:
+        return await asyncio.to_thread(self.scan)
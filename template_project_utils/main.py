@@ -1,13 +1,20 @@
 # Copyright (C) 2024 twyleg
 import argparse
+import contextlib
+import os
 import re
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterator, List
 
 from simple_python_app.generic_application import GenericApplication
 
 from template_project_utils import __version__
+from template_project_utils.batch import copy_template, load_batch_manifest
 from template_project_utils.keyword_scanner import KeywordScanner
+from template_project_utils.operation_plan import OperationPlan, OperationPlanExecutor
+from template_project_utils.scan_cache import default_scan_cache_file_path
+from template_project_utils.scan_output import NdjsonScanOutput
+from template_project_utils.template_artifact import TemplateArtifact
 from template_project_utils.template_initializer import TemplateInitializer
 
 
@@ -46,6 +53,133 @@ class TemplateProjectUtils(GenericApplication):
 
             return closure_check_regex
 
+        argparser.add_argument(
+            "--auto",
+            action="store_true",
+            help="Update and rename all files and dirs found by the placeholder scan, in addition to the ones from the config.",
+        )
+
+        argparser.add_argument(
+            "--fsync",
+            action="store_true",
+            help="Sync updated files and their directories to disk at the end of each phase.",
+        )
+
+        def jobs_type(arg_value: str) -> int:
+            """Argument type for a positive number of jobs or "auto" (number of CPUs)."""
+            if arg_value == "auto":
+                return os.cpu_count() or 1
+            try:
+                jobs = int(arg_value)
+            except ValueError:
+                raise argparse.ArgumentTypeError("invalid value")
+            if jobs < 1:
+                raise argparse.ArgumentTypeError("invalid value")
+            return jobs
+
+        argparser.add_argument(
+            "-j",
+            "--jobs",
+            type=jobs_type,
+            default=1,
+            help='Number of parallel jobs used to update files (N or "auto").',
+        )
+
+        argparser.add_argument(
+            "--scan-jobs",
+            type=jobs_type,
+            default=1,
+            help='Number of parallel jobs used to read files during the placeholder scan (N or "auto").',
+        )
+
+        def size_type(arg_value: str) -> int:
+            """Argument type for a size in bytes with an optional K, M or G suffix."""
+            match = re.match(r"^(\d+)([KMG]?)$", arg_value.upper())
+            if not match:
+                raise argparse.ArgumentTypeError("invalid value")
+            return int(match.group(1)) * 1024 ** "_KMG".index(match.group(2) or "_")
+
+        argparser.add_argument(
+            "--max-scan-file-size",
+            type=size_type,
+            default=None,
+            help="Skip files larger than this size (e.g. 50M) during the placeholder scan. Overrides max_scan_file_size from the config. "
+            "Skipped files are listed and only fail the verification if they are in update_files.",
+        )
+
+        argparser.add_argument(
+            "--git-tracked",
+            action="store_true",
+            help="Scan only files tracked in the git index instead of walking the whole project dir.",
+        )
+
+        argparser.add_argument(
+            "--no-scan-cache",
+            action="store_true",
+            help="Don't use the persistent cache of per file scan results (stored in the user cache dir).",
+        )
+
+        argparser.add_argument(
+            "--scan-output-file",
+            metavar="FILE",
+            default=None,
+            help="Stream the placeholder scan results to this file as they are found (NDJSON: one JSON record per line, followed by a "
+            "summary record per scan).",
+        )
+
+        argparser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Don't initialize the project, but keep reporting the placeholders left in it while it is edited (Linux only, stop with Ctrl+C).",
+        )
+
+        argparser.add_argument(
+            "--executor",
+            choices=[executor_type.value for executor_type in TemplateInitializer.ExecutorType],
+            default=TemplateInitializer.ExecutorType.THREAD.value,
+            help="Executor used for parallel jobs (thread for I/O bound, process for CPU bound templates).",
+        )
+
+        argparser.add_argument(
+            "--plan-output",
+            metavar="PLAN_FILE",
+            help="Only create the operation plan and write it to PLAN_FILE (JSON) instead of initializing the project.",
+        )
+
+        argparser.add_argument(
+            "--plan",
+            metavar="PLAN_FILE",
+            help="Execute a previously created operation plan instead of creating one from the config.",
+        )
+
+        argparser.add_argument(
+            "--batch",
+            metavar="MANIFEST_FILE",
+            help="Create a project from the template for every entry (destination and placeholder targets) of MANIFEST_FILE (YAML). "
+            "Placeholder target pairs given as arguments are used for all entries.",
+        )
+
+        argparser.add_argument(
+            "--compile",
+            metavar="ARTIFACT_FILE",
+            help="Only analyze the template and write the placeholder offsets and the plan without targets to ARTIFACT_FILE "
+            "(JSON, outside of the template dir) instead of initializing the project.",
+        )
+
+        argparser.add_argument(
+            "--artifact",
+            metavar="ARTIFACT_FILE",
+            help="Initialize the project from the analysis in ARTIFACT_FILE instead of scanning the template. "
+            "The artifact is compiled again if it is missing or the template files changed.",
+        )
+
+        argparser.add_argument(
+            "--full-verify",
+            action="store_true",
+            help="Verify the result with a full rescan of the project instead of rescanning only the paths touched by the initialization. "
+            "Fails if any file is skipped due to the maximum scan file size.",
+        )
+
         argparser.add_argument(
             "placeholder_target",
             metavar="placeholder_target",
@@ -61,32 +195,263 @@ class TemplateProjectUtils(GenericApplication):
             placeholder_target_dict[placeholder] = target
         return placeholder_target_dict
 
-    def run(self, args: argparse.Namespace) -> int:
-        config_file_path = Path(args.config) if args.config else Path.cwd() / "template_config.yaml"
-        template_initializer = TemplateInitializer(config_file_path, dry_run=args.dry)
+    @contextlib.contextmanager
+    def _open_scan_output(self, args: argparse.Namespace) -> Iterator[NdjsonScanOutput | None]:
+        if not args.scan_output_file:
+            yield None
+        else:
+            with open(args.scan_output_file, "w", encoding="utf-8") as scan_output_file:
+                yield NdjsonScanOutput(scan_output_file)
 
-        placeholder_keywords = list(template_initializer.placeholder_target_dict.keys())
-        placeholder_keyword_scanner = KeywordScanner(scan_base_dir_path=config_file_path.parent, keywords=placeholder_keywords)
+    def _execute_plan(self, args: argparse.Namespace) -> int:
+        with self._open_scan_output(args) as scan_output:
+            return self._execute_plan_with_scan_output(args, scan_output)
 
-        placeholder_target_dict = self._get_placeholder_target_pairs_from_arguments(args)
-        self.logm.debug("Placeholder Target pairs from arguments: %s", placeholder_target_dict)
+    def _execute_plan_with_scan_output(self, args: argparse.Namespace, scan_output: NdjsonScanOutput | None) -> int:
+        working_dir_path = Path(args.config).parent if args.config else Path.cwd()
+        plan = OperationPlan.load(Path(args.plan))
+        executor = OperationPlanExecutor(
+            dry_run=args.dry,
+            jobs=args.jobs,
+            executor_type=OperationPlanExecutor.ExecutorType(args.executor),
+            durable=args.fsync,
+        )
+        placeholder_keyword_scanner = KeywordScanner(
+            scan_base_dir_path=working_dir_path,
+            keywords=list(plan.placeholder_target_dict.keys()),
+            jobs=args.scan_jobs,
+            max_file_size=args.max_scan_file_size,
+            git_tracked=args.git_tracked,
+            scan_cache_file_path=None if args.no_scan_cache else default_scan_cache_file_path(),
+            scan_output=scan_output,
+        )
 
+        if scan_output:
+            scan_output.begin("prerun")
         prerun_scan_results = placeholder_keyword_scanner.scan()
-        template_initializer.init(placeholder_target_dict)
-        postrun_scan_results = placeholder_keyword_scanner.scan()
-
         self.logm.debug("Placeholder keyword pre init run:")
         prerun_scan_results.log()
+        executor.execute(plan, working_dir_path)
+        return self._evaluate_verification(self._verify(args, placeholder_keyword_scanner, prerun_scan_results, plan))
+
+    def _verify(
+        self,
+        args: argparse.Namespace,
+        keyword_scanner: KeywordScanner,
+        prerun_scan_results: KeywordScanner.ScanResults,
+        executed_plan: OperationPlan,
+        scan_name: str = "postrun",
+    ) -> bool:
+        if keyword_scanner.scan_output:
+            keyword_scanner.scan_output.begin(scan_name)
+        if args.full_verify and not args.dry:
+            # Renamed files are not in the git index yet, so the tracked files are checked under their new names
+            keyword_scanner = keyword_scanner.with_index_renames(executed_plan.renames())
+        if args.full_verify and not keyword_scanner.scan_output:
+            # Only the answer is needed, so the check stops at the first placeholder left
+            leftover_match = keyword_scanner.any_match()
+            if leftover_match and leftover_match.type == KeywordScanner.MatchType.UNCHECKED_CONTENT:
+                self.logm.error("Unable to verify the initialization, file exceeds the maximum scan file size: %s", leftover_match.path)
+            elif leftover_match:
+                self.logm.error("Placeholder '%s' left (%s): %s", leftover_match.keyword, leftover_match.type.value, leftover_match.path)
+            return leftover_match is None
+        if args.full_verify:
+            postrun_scan_results = keyword_scanner.scan()
+        else:
+            # Dry runs don't touch anything, so the pre-run results are still valid
+            postrun_scan_results = keyword_scanner.scan_incremental(
+                prerun_scan_results, executed_plan if not args.dry else OperationPlan(executed_plan.placeholder_target_dict)
+            )
         self.logm.debug("Placeholder keyword post init run:")
         postrun_scan_results.log()
+        # Large files are skipped on purpose (e.g. build artifacts) and only listed as a warning. But if the plan was meant
+        # to update one of them, or the full check was asked for, the result can't count as a success.
+        update_file_targets = set(executed_plan.update_file_targets())
+        unchecked_files = [
+            skipped_large_file
+            for skipped_large_file in postrun_scan_results.skipped_large_files
+            if args.full_verify or skipped_large_file in update_file_targets
+        ]
+        if postrun_scan_results.empty() and unchecked_files:
+            self.logm.error("Unable to verify the initialization, files not checked due to the maximum scan file size: %s", ", ".join(unchecked_files))
+            return False
+        return postrun_scan_results.empty()
+
+    def _log_placeholder_totals(self, scan_results: KeywordScanner.ScanResults) -> None:
+        self.logm.info(
+            "Placeholders: %d in file names, %d in dir names, %d in file contents",
+            sum(scan_results.file_name_count.values()),
+            sum(scan_results.dir_name_count.values()),
+            sum(scan_results.file_content_count.values()),
+        )
+
+    def _watch(self, keyword_scanner: KeywordScanner, scan_results: KeywordScanner.ScanResults) -> int:
+        if keyword_scanner.scan_output:
+            keyword_scanner.scan_output.begin("watch")
+        self._log_placeholder_totals(scan_results)
+        try:
+            for scan_results in keyword_scanner.watch(scan_results):
+                self._log_placeholder_totals(scan_results)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    def _run_batch(
+        self,
+        args: argparse.Namespace,
+        template_initializer: TemplateInitializer,
+        keyword_scanner: KeywordScanner,
+        template_scan_results: KeywordScanner.ScanResults,
+        placeholder_target_dict: Dict[str, str],
+        compiled_plan: OperationPlan | None,
+    ) -> int:
+        # Every project starts as an identical copy of the template, so the loaded config, the compiled matchers,
+        # the scan results and the plan compiled without targets are shared by all of them
+        template_dir_path = template_initializer.working_dir_path.resolve()
+        batch_entries = load_batch_manifest(Path(args.batch), template_dir_path)
+        if compiled_plan is None:
+            compiled_plan = template_initializer.compile_plan(template_dir_path, template_scan_results if args.auto else None)
+        failed_destination_paths: List[Path] = []
+
+        for batch_entry in batch_entries:
+            self.logm.info("Initializing project: %s", batch_entry.destination_path)
+            entry_placeholder_target_dict = {**placeholder_target_dict, **batch_entry.placeholder_target_dict}
+            missing_placeholders = [
+                placeholder for placeholder in template_initializer.placeholder_target_dict if placeholder not in entry_placeholder_target_dict
+            ]
+            try:
+                if missing_placeholders:
+                    raise RuntimeError(f"No targets for placeholders: {', '.join(missing_placeholders)}")
+                # Dry runs don't create the copies, they run against the template itself
+                working_dir_path = template_dir_path if args.dry else batch_entry.destination_path
+                if not args.dry:
+                    copy_template(template_dir_path, working_dir_path, [batch_entry.destination_path for batch_entry in batch_entries])
+                plan = template_initializer.init(
+                    entry_placeholder_target_dict, scan_results=template_scan_results, working_dir_path=working_dir_path, compiled_plan=compiled_plan
+                )
+                verified = self._verify(
+                    args, keyword_scanner.with_base_dir(working_dir_path), template_scan_results, plan, f"postrun:{batch_entry.destination_path}"
+                )
+            except (RuntimeError, OSError) as e:
+                self.logm.error("Unable to initialize project %s: %s", batch_entry.destination_path, e)
+                verified = False
+            if not verified:
+                failed_destination_paths.append(batch_entry.destination_path)
+
+        self.logm.info("Batch: %d of %d projects initialized successfully", len(batch_entries) - len(failed_destination_paths), len(batch_entries))
+        for failed_destination_path in failed_destination_paths:
+            self.logm.error("  Failed: %s", failed_destination_path)
+        return 0 if not failed_destination_paths else -1
 
-        if postrun_scan_results.empty():
+    def _load_artifact(self, args: argparse.Namespace, template_initializer: TemplateInitializer, keyword_scanner: KeywordScanner) -> TemplateArtifact | None:
+        artifact_file_path = Path(args.artifact)
+        if not artifact_file_path.exists():
+            self.logm.info("Template artifact does not exist yet: %s", artifact_file_path)
+            return None
+        try:
+            artifact = TemplateArtifact.load(artifact_file_path)
+        except (ValueError, KeyError, RuntimeError) as e:
+            self.logm.warning("Unable to load template artifact %s: %s", artifact_file_path, e)
+            return None
+        if not artifact.is_valid(template_initializer.placeholders, args.auto, keyword_scanner):
+            self.logm.info("Template changed since the artifact was compiled: %s", artifact_file_path)
+            return None
+        self.logm.info("Using template artifact: %s", artifact_file_path)
+        return artifact
+
+    def _compile_artifact(
+        self,
+        args: argparse.Namespace,
+        template_initializer: TemplateInitializer,
+        keyword_scanner: KeywordScanner,
+        scan_results: KeywordScanner.ScanResults,
+        artifact_file_path: Path,
+    ) -> TemplateArtifact:
+        # The artifact would change the template it describes
+        if artifact_file_path.resolve().is_relative_to(keyword_scanner.scan_base_dir_path.resolve()):
+            raise RuntimeError(f"Template artifact must be stored outside of the template dir: {artifact_file_path}")
+        compiled_plan = template_initializer.compile_plan(scan_results=scan_results if args.auto else None)
+        artifact = TemplateArtifact(
+            template_initializer.placeholders, args.auto, keyword_scanner.settings(), TemplateArtifact.hash_files(keyword_scanner), scan_results, compiled_plan
+        )
+        artifact.save(artifact_file_path)
+        self.logm.info("Template artifact written to: %s", artifact_file_path)
+        return artifact
+
+    def _evaluate_verification(self, verified: bool) -> int:
+        if verified:
             self.logm.info("Project initialized successfully!")
             return 0
         else:
             self.logm.error("Project initialization failed!")
             return -1
 
+    def run(self, args: argparse.Namespace) -> int:
+        if args.plan:
+            return self._execute_plan(args)
+        with self._open_scan_output(args) as scan_output:
+            return self._run_with_scan_output(args, scan_output)
+
+    def _run_with_scan_output(self, args: argparse.Namespace, scan_output: NdjsonScanOutput | None) -> int:
+
+        config_file_path = Path(args.config) if args.config else Path.cwd() / "template_config.yaml"
+        template_initializer = TemplateInitializer(
+            config_file_path,
+            dry_run=args.dry,
+            jobs=args.jobs,
+            executor_type=TemplateInitializer.ExecutorType(args.executor),
+            durable=args.fsync,
+        )
+
+        placeholder_keywords = template_initializer.placeholders
+        placeholder_keyword_scanner = KeywordScanner(
+            scan_base_dir_path=config_file_path.parent,
+            keywords=placeholder_keywords,
+            jobs=args.scan_jobs,
+            max_file_size=args.max_scan_file_size if args.max_scan_file_size is not None else template_initializer.max_scan_file_size,
+            git_tracked=args.git_tracked,
+            scan_cache_file_path=None if args.no_scan_cache else default_scan_cache_file_path(),
+            scan_output=scan_output,
+        )
+
+        placeholder_target_dict = self._get_placeholder_target_pairs_from_arguments(args)
+        self.logm.debug("Placeholder Target pairs from arguments: %s", placeholder_target_dict)
+
+        # A valid artifact replaces the scan of the template, its scan results are the same
+        artifact = self._load_artifact(args, template_initializer, placeholder_keyword_scanner) if args.artifact and not args.compile else None
+        if artifact:
+            prerun_scan_results = artifact.scan_results
+        else:
+            if scan_output:
+                scan_output.begin("prerun")
+            prerun_scan_results = placeholder_keyword_scanner.scan()
+        self.logm.debug("Placeholder keyword pre init run:")
+        prerun_scan_results.log()
+
+        if args.compile or (args.artifact and not artifact):
+            artifact_file_path = Path(args.compile if args.compile else args.artifact)
+            artifact = self._compile_artifact(args, template_initializer, placeholder_keyword_scanner, prerun_scan_results, artifact_file_path)
+            if args.compile:
+                return 0
+        compiled_plan = artifact.compiled_plan if artifact else None
+
+        if args.watch:
+            return self._watch(placeholder_keyword_scanner, prerun_scan_results)
+        if args.batch:
+            return self._run_batch(args, template_initializer, placeholder_keyword_scanner, prerun_scan_results, placeholder_target_dict, compiled_plan)
+        # With a compiled plan the scan results only provide the offsets of the placeholders, otherwise they are used for the auto discovery
+        scan_results = prerun_scan_results if args.auto or compiled_plan else None
+
+        if args.plan_output:
+            plan = template_initializer.plan(placeholder_target_dict, scan_results=scan_results, compiled_plan=compiled_plan)
+            plan.log()
+            plan.save(Path(args.plan_output))
+            self.logm.info("Operation plan written to: %s", args.plan_output)
+            return 0
+
+        plan = template_initializer.init(placeholder_target_dict, scan_results=scan_results, compiled_plan=compiled_plan)
+        return self._evaluate_verification(self._verify(args, placeholder_keyword_scanner, prerun_scan_results, plan))
+
 
 def main():
     template_project_utils = TemplateProjectUtils()
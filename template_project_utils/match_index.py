@@ -0,0 +1,71 @@
+# Copyright (C) 2024 twyleg
+from array import array
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+class FileMatches:
+    # One record per scanned file with matches. The matches are kept in flat arrays instead of one object
+    # per match, so hundreds of thousands of matches only cost a few bytes each.
+    __slots__ = ("encoding", "bom_length", "keywords", "keyword_indices", "offsets", "lines", "columns")
+
+    def __init__(self, encoding: str, bom_length: int, keywords: List[str]) -> None:
+        self.encoding = encoding
+        self.bom_length = bom_length
+        self.keywords = keywords
+        self.keyword_indices = array("H")
+        self.offsets = array("Q")
+        self.lines = array("L")
+        self.columns = array("L")
+
+    def add(self, keyword_index: int, offset: int, line: int, column: int) -> None:
+        self.keyword_indices.append(keyword_index)
+        self.offsets.append(offset)
+        self.lines.append(line)
+        self.columns.append(column)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, FileMatches):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __iter__(self) -> Iterator[Tuple[str, int, int, int]]:
+        for keyword_index, offset, line, column in zip(self.keyword_indices, self.offsets, self.lines, self.columns):
+            yield self.keywords[keyword_index], offset, line, column
+
+    def iter_counted(self) -> Iterator[Tuple[str, int, int, int]]:
+        # All occurrences are indexed, even overlapping ones of the same keyword. Counts exclude those, like str.count().
+        lengths = [len(keyword.encode(self.encoding)) for keyword in self.keywords]
+        ends: Dict[int, int] = {}
+        for keyword_index, offset, line, column in zip(self.keyword_indices, self.offsets, self.lines, self.columns):
+            if offset >= ends.get(keyword_index, 0):
+                ends[keyword_index] = offset + lengths[keyword_index]
+                yield self.keywords[keyword_index], offset, line, column
+
+    def count(self) -> Dict[str, int]:
+        count_dict = dict.fromkeys(self.keywords, 0)
+        for keyword, _, _, _ in self.iter_counted():
+            count_dict[keyword] += 1
+        return count_dict
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "encoding": self.encoding,
+            "bom_length": self.bom_length,
+            "keywords": [self.keywords[keyword_index] for keyword_index in self.keyword_indices],
+            "offsets": self.offsets.tolist(),
+            "lines": self.lines.tolist(),
+            "columns": self.columns.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, file_matches_dict: Dict[str, Any], keywords: List[str]) -> "FileMatches":
+        file_matches = cls(file_matches_dict["encoding"], file_matches_dict["bom_length"], keywords)
+        keyword_indices = {keyword: keywords.index(keyword) for keyword in set(keywords)}
+        for keyword, offset, line, column in zip(
+            file_matches_dict["keywords"], file_matches_dict["offsets"], file_matches_dict["lines"], file_matches_dict["columns"]
+        ):
+            file_matches.add(keyword_indices[keyword], offset, line, column)
+        return file_matches
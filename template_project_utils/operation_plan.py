@@ -0,0 +1,328 @@
+# Copyright (C) 2024 twyleg
+import asyncio
+import json
+import logging
+import os
+import shutil
+import template_project_utils.git as git
+import weakref
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Tuple, TypeVar
+
+from template_project_utils.atomic_file import FsyncBatch
+from template_project_utils.match_index import FileMatches
+from template_project_utils.substitution import Substitution, DEFAULT_STREAMING_THRESHOLD
+
+
+logm = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_ASYNC_CONCURRENCY = 8
+
+
+def _update_file(substitution: Substitution, filepath: Path, file_matches: FileMatches | None = None) -> bool:
+    # Files in a plan are known to contain placeholders, so the check before rewriting is skipped
+    return substitution.replace_in_file(filepath, check=False, file_matches=file_matches)
+
+
+class OperationPlan:
+    VERSION = 1
+
+    class OperationType(Enum):
+        UPDATE_FILE = "update_file"
+        RENAME_FILE = "rename_file"
+        RENAME_DIR = "rename_dir"
+        REMOVE_FILE = "remove_file"
+        REMOVE_DIR = "remove_dir"
+        REMOVE_REMOTE = "remove_remote"
+
+    @dataclass
+    class Operation:
+        type: "OperationPlan.OperationType"
+        path: str
+        target_path: str | None = None
+        files: int = 0
+        bytes: int = 0
+
+        def to_dict(self) -> Dict[str, Any]:
+            return {"type": self.type.value, "path": self.path, "target_path": self.target_path, "files": self.files, "bytes": self.bytes}
+
+        @classmethod
+        def from_dict(cls, operation_dict: Dict[str, Any]) -> "OperationPlan.Operation":
+            return cls(
+                type=OperationPlan.OperationType(operation_dict["type"]),
+                path=operation_dict["path"],
+                target_path=operation_dict.get("target_path"),
+                files=operation_dict.get("files", 0),
+                bytes=operation_dict.get("bytes", 0),
+            )
+
+    def __init__(self, placeholder_target_dict: Dict[str, str]) -> None:
+        self.placeholder_target_dict = placeholder_target_dict
+        self.operations: List[OperationPlan.Operation] = []
+        self.skipped_files: List[str] = []
+
+    def add(self, operation_type: OperationType, path: str, target_path: str | None = None, files: int = 0, bytes: int = 0) -> None:
+        self.operations.append(OperationPlan.Operation(operation_type, path, target_path, files, bytes))
+
+    def operations_of_type(self, operation_type: OperationType) -> List[Operation]:
+        return [operation for operation in self.operations if operation.type == operation_type]
+
+    def renames(self) -> List[Tuple[str, str]]:
+        # Source and target path of all renames, in execution order
+        return [
+            (operation.path.rstrip("/"), operation.target_path.rstrip("/"))
+            for operation in self.operations
+            if operation.type in (OperationPlan.OperationType.RENAME_FILE, OperationPlan.OperationType.RENAME_DIR) and operation.target_path
+        ]
+
+    def update_file_targets(self) -> List[str]:
+        # Paths of all files to update (rewritten or skipped) after the renames of the plan are executed
+        renames = self.renames()
+        update_file_targets = []
+        for path in [operation.path for operation in self.operations_of_type(OperationPlan.OperationType.UPDATE_FILE)] + self.skipped_files:
+            for src, dst in renames:
+                if path == src or path.startswith(src + "/"):
+                    path = dst + path[len(src) :]
+            update_file_targets.append(path)
+        return update_file_targets
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.VERSION,
+            "placeholder_target_dict": self.placeholder_target_dict,
+            "skipped_files": self.skipped_files,
+            "operations": [operation.to_dict() for operation in self.operations],
+        }
+
+    @classmethod
+    def from_dict(cls, plan_dict: Dict[str, Any]) -> "OperationPlan":
+        if plan_dict.get("version") != cls.VERSION:
+            raise RuntimeError(f"Unsupported operation plan version: {plan_dict.get('version')}")
+        plan = cls(plan_dict["placeholder_target_dict"])
+        plan.skipped_files = plan_dict.get("skipped_files", [])
+        plan.operations = [OperationPlan.Operation.from_dict(operation_dict) for operation_dict in plan_dict["operations"]]
+        return plan
+
+    def save(self, plan_file_path: Path) -> None:
+        with open(plan_file_path, "w") as plan_file:
+            json.dump(self.to_dict(), plan_file, indent=2)
+
+    @classmethod
+    def load(cls, plan_file_path: Path) -> "OperationPlan":
+        with open(plan_file_path, "r") as plan_file:
+            return cls.from_dict(json.load(plan_file))
+
+    def log(self) -> None:
+        logm.debug("Operation plan:")
+        for operation_type in OperationPlan.OperationType:
+            operations = self.operations_of_type(operation_type)
+            files = sum(operation.files for operation in operations)
+            size = sum(operation.bytes for operation in operations)
+            logm.debug("  %s: %d operations, %d files, %d bytes", operation_type.value, len(operations), files, size)
+
+
+class OperationPlanExecutor:
+    class ExecutorType(Enum):
+        THREAD = "thread"
+        PROCESS = "process"
+
+    def __init__(
+        self,
+        dry_run=False,
+        streaming_threshold: int = DEFAULT_STREAMING_THRESHOLD,
+        jobs: int = 1,
+        executor_type: ExecutorType = ExecutorType.THREAD,
+        async_concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+        durable: bool = False,
+    ):
+        self.dry_run = dry_run
+        self.streaming_threshold = streaming_threshold
+        self.jobs = jobs
+        self.executor_type = executor_type
+        self.async_concurrency = async_concurrency
+        self._async_semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+        self.durable = durable
+
+        if self.jobs < 1:
+            raise RuntimeError(f"Invalid number of jobs: {self.jobs}")
+
+    def _create_executor(self) -> Executor:
+        if self.executor_type == OperationPlanExecutor.ExecutorType.PROCESS:
+            return ProcessPoolExecutor(max_workers=self.jobs)
+        else:
+            return ThreadPoolExecutor(max_workers=self.jobs)
+
+    def map_blocking(self, func: Callable[[T], Any], items: Iterable[T]) -> List[Any]:
+        # With the process executor, func and the items have to be picklable (e.g. a partial of a module level function)
+        items = list(items)
+        if self.jobs > 1:
+            with self._create_executor() as executor:
+                # Items are sent to worker processes in chunks, threads ignore the chunk size
+                return list(executor.map(func, items, chunksize=max(1, len(items) // (self.jobs * 4))))
+        return [func(item) for item in items]
+
+    def _get_async_semaphore(self) -> asyncio.Semaphore:
+        # A semaphore is bound to the event loop it is first used in, so every loop the executor runs in gets its own
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_semaphores:
+            self._async_semaphores[loop] = asyncio.Semaphore(self.async_concurrency)
+        return self._async_semaphores[loop]
+
+    async def run_blocking(self, func: Callable[..., T], *args: Any) -> T:
+        async with self._get_async_semaphore():
+            return await asyncio.to_thread(func, *args)
+
+    def _sync_phase(self, working_dir_path: Path, files: List[str] | None = None, parent_dirs_of: List[str] | None = None) -> None:
+        # Data and directory entries are synced once per phase instead of once per file
+        if not self.durable or self.dry_run:
+            return
+        fsync_batch = FsyncBatch()
+        for file in files if files else []:
+            fsync_batch.add_file(working_dir_path / file)
+        for path in parent_dirs_of if parent_dirs_of else []:
+            fsync_batch.add_dir((working_dir_path / path).parent)
+        fsync_batch.commit()
+
+    @classmethod
+    def _log_update_file(cls, placeholder_target_dict: Dict[str, str], file_to_update: str) -> None:
+        for placeholder, target in placeholder_target_dict.items():
+            logm.info("  %s: %s -> %s", file_to_update, placeholder, target)
+
+    def _create_substitution(self, plan: OperationPlan) -> Substitution:
+        assert all(plan.placeholder_target_dict.values())
+        return Substitution(plan.placeholder_target_dict, streaming_threshold=self.streaming_threshold)
+
+    def _update_files_parallel(
+        self, substitution: Substitution, files_to_update: List[str], working_dir_path: Path, file_matches: Dict[str, FileMatches]
+    ) -> None:
+        with self._create_executor() as executor:
+            futures: List[Future] = [executor.submit(_update_file, substitution, working_dir_path / f, file_matches.get(f)) for f in files_to_update]
+            try:
+                # Results are collected in plan order, so log output and the raised error
+                # are the same as with the serial execution.
+                for file_to_update, future in zip(files_to_update, futures):
+                    self._log_update_file(substitution.placeholder_target_dict, file_to_update)
+                    future.result()
+            except BaseException:
+                executor.shutdown(cancel_futures=True)
+                raise
+
+    def _update_files(self, plan: OperationPlan, working_dir_path: Path, file_matches: Dict[str, FileMatches]) -> None:
+        logm.info("Updating files:")
+        files_to_update = [operation.path for operation in plan.operations_of_type(OperationPlan.OperationType.UPDATE_FILE)]
+        if not files_to_update and not plan.skipped_files:
+            logm.info("  Nothing!")
+            return
+
+        if self.dry_run or not files_to_update:
+            for file_to_update in files_to_update:
+                self._log_update_file(plan.placeholder_target_dict, file_to_update)
+        elif self.jobs > 1:
+            self._update_files_parallel(self._create_substitution(plan), files_to_update, working_dir_path, file_matches)
+        else:
+            substitution = self._create_substitution(plan)
+            for file_to_update in files_to_update:
+                self._log_update_file(plan.placeholder_target_dict, file_to_update)
+                _update_file(substitution, working_dir_path / file_to_update, file_matches.get(file_to_update))
+        logm.info("  Rewritten: %d, skipped (no placeholders): %d", len(files_to_update), len(plan.skipped_files))
+        self._sync_phase(working_dir_path, files=files_to_update)
+
+    async def _aupdate_files(self, plan: OperationPlan, working_dir_path: Path, file_matches: Dict[str, FileMatches]) -> None:
+        logm.info("Updating files:")
+        files_to_update = [operation.path for operation in plan.operations_of_type(OperationPlan.OperationType.UPDATE_FILE)]
+        if not files_to_update and not plan.skipped_files:
+            logm.info("  Nothing!")
+            return
+
+        for file_to_update in files_to_update:
+            self._log_update_file(plan.placeholder_target_dict, file_to_update)
+        if files_to_update and not self.dry_run:
+            substitution = self._create_substitution(plan)
+            await asyncio.gather(
+                *[
+                    self.run_blocking(_update_file, substitution, working_dir_path / file_to_update, file_matches.get(file_to_update))
+                    for file_to_update in files_to_update
+                ]
+            )
+        logm.info("  Rewritten: %d, skipped (no placeholders): %d", len(files_to_update), len(plan.skipped_files))
+        await self.run_blocking(self._sync_phase, working_dir_path, files_to_update)
+
+    def _rename(self, plan: OperationPlan, working_dir_path: Path, operation_type: OperationPlan.OperationType) -> None:
+        logm.info("Renaming files:" if operation_type == OperationPlan.OperationType.RENAME_FILE else "Renaming dirs:")
+        operations = plan.operations_of_type(operation_type)
+        if not operations:
+            logm.info("  Nothing!")
+            return
+
+        for operation in operations:
+            assert operation.target_path
+            logm.info("  %s -> %s", operation.path, operation.target_path)
+            if not self.dry_run:
+                shutil.move(working_dir_path / operation.path, working_dir_path / operation.target_path)
+        self._sync_phase(working_dir_path, parent_dirs_of=[operation.path for operation in operations])
+
+    def _remove(self, path: Path, operation_type: OperationPlan.OperationType) -> None:
+        if operation_type == OperationPlan.OperationType.REMOVE_FILE:
+            os.remove(path)
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _remove_all(self, plan: OperationPlan, working_dir_path: Path, operation_type: OperationPlan.OperationType) -> None:
+        logm.info("Removing files:" if operation_type == OperationPlan.OperationType.REMOVE_FILE else "Removing dirs:")
+        operations = plan.operations_of_type(operation_type)
+        if not operations:
+            logm.info("  Nothing!")
+            return
+
+        for operation in operations:
+            logm.info("  %s", operation.path)
+            if not self.dry_run:
+                self._remove(working_dir_path / operation.path, operation_type)
+        self._sync_phase(working_dir_path, parent_dirs_of=[operation.path for operation in operations])
+
+    async def _aremove_all(self, plan: OperationPlan, working_dir_path: Path, operation_type: OperationPlan.OperationType) -> None:
+        logm.info("Removing files:" if operation_type == OperationPlan.OperationType.REMOVE_FILE else "Removing dirs:")
+        operations = plan.operations_of_type(operation_type)
+        if not operations:
+            logm.info("  Nothing!")
+            return
+
+        tasks = []
+        for operation in operations:
+            logm.info("  %s", operation.path)
+            if not self.dry_run:
+                tasks.append(self.run_blocking(self._remove, working_dir_path / operation.path, operation_type))
+        await asyncio.gather(*tasks)
+        await self.run_blocking(self._sync_phase, working_dir_path, None, [operation.path for operation in operations])
+
+    def _remove_remotes(self, plan: OperationPlan, working_dir_path: Path) -> None:
+        for operation in plan.operations_of_type(OperationPlan.OperationType.REMOVE_REMOTE):
+            if self.dry_run:
+                logm.info("Removing remote '%s'", operation.path)
+            else:
+                git.remove_remote(working_dir_path, operation.path)
+
+    def execute(self, plan: OperationPlan, working_dir_path: Path, file_matches: Dict[str, FileMatches] | None = None) -> None:
+        # Match offsets of a scan (if given) let the rewrite jump straight to the placeholders instead of searching for them
+        plan.log()
+        self._update_files(plan, working_dir_path, file_matches if file_matches else {})
+        self._rename(plan, working_dir_path, OperationPlan.OperationType.RENAME_FILE)
+        self._rename(plan, working_dir_path, OperationPlan.OperationType.RENAME_DIR)
+        self._remove_all(plan, working_dir_path, OperationPlan.OperationType.REMOVE_FILE)
+        self._remove_all(plan, working_dir_path, OperationPlan.OperationType.REMOVE_DIR)
+        self._remove_remotes(plan, working_dir_path)
+
+    async def aexecute(self, plan: OperationPlan, working_dir_path: Path, file_matches: Dict[str, FileMatches] | None = None) -> None:
+        plan.log()
+        await self._aupdate_files(plan, working_dir_path, file_matches if file_matches else {})
+        # Renames are order dependent (e.g. files inside renamed dirs), so each rename phase is offloaded as a whole
+        await self.run_blocking(self._rename, plan, working_dir_path, OperationPlan.OperationType.RENAME_FILE)
+        await self.run_blocking(self._rename, plan, working_dir_path, OperationPlan.OperationType.RENAME_DIR)
+        await self._aremove_all(plan, working_dir_path, OperationPlan.OperationType.REMOVE_FILE)
+        await self._aremove_all(plan, working_dir_path, OperationPlan.OperationType.REMOVE_DIR)
+        await self.run_blocking(self._remove_remotes, plan, working_dir_path)
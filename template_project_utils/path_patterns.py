@@ -0,0 +1,119 @@
+# Copyright (C) 2024 twyleg
+import os
+import re
+from pathlib import Path
+from typing import Dict, List
+
+
+DEFAULT_EXCLUDED_DIRS = [".git", "venv", "logs"]
+
+GLOB_CHARS = "*?"
+
+
+def is_glob(entry: str) -> bool:
+    # Brackets alone don't make a glob, so paths like "data[1].txt" stay literal. Within a glob they are a character class.
+    return entry.startswith("!") or any(glob_char in entry for glob_char in GLOB_CHARS)
+
+
+def _translate_glob_segment(segment: str) -> str:
+    regex = ""
+    i = 0
+    while i < len(segment):
+        char = segment[i]
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            # A "]" right after the opening "[" or "[!" is part of the class
+            start = i + 2 if segment[i + 1 : i + 2] == "!" else i + 1
+            end = segment.find("]", start + 1 if segment[start : start + 1] == "]" else start)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                char_class = segment[start:end].replace("\\", "\\\\").replace("[", "\\[").replace("]", "\\]")
+                if char_class.startswith("^"):
+                    char_class = "\\" + char_class
+                if segment[i + 1 : i + 2] == "!":
+                    char_class = "^" + char_class
+                regex += f"[{char_class}]"
+                i = end
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+
+def translate_glob(pattern: str) -> str:
+    segments = pattern.strip("/").split("/")
+    regex = ""
+    for i, segment in enumerate(segments):
+        last_segment = i == len(segments) - 1
+        if segment == "**":
+            regex += ".*" if last_segment else "(?:[^/]+/)*"
+        else:
+            regex += _translate_glob_segment(segment) + ("" if last_segment else "/")
+    return regex + r"\Z"
+
+
+class PathPatternList:
+
+    def __init__(self, entries: List[str], match_dirs: bool = False) -> None:
+        self.entries = entries
+        self.match_dirs = match_dirs
+        self.glob_entry_indices: List[int] = [i for i, entry in enumerate(entries) if is_glob(entry) and not entry.startswith("!")]
+
+        # All globs of a list are compiled into one pattern, the named group tells which entry matched
+        include_regexes = [f"(?P<g{i}>{translate_glob(entries[i])})" for i in self.glob_entry_indices]
+        exclude_regexes = [translate_glob(entry[1:]) for entry in entries if entry.startswith("!")]
+        self.include_pattern = re.compile("|".join(include_regexes)) if include_regexes else None
+        self.exclude_pattern = re.compile("|".join(exclude_regexes)) if exclude_regexes else None
+
+    def has_globs(self) -> bool:
+        return self.include_pattern is not None or self.exclude_pattern is not None
+
+    def is_excluded(self, relative_path: str) -> bool:
+        return self.exclude_pattern is not None and self.exclude_pattern.match(relative_path) is not None
+
+    def match(self, relative_path: str) -> int | None:
+        match = self.include_pattern.match(relative_path) if self.include_pattern else None
+        return int(match.lastgroup[1:]) if match and match.lastgroup else None
+
+    def resolve(self, matches: Dict[int, List[str]]) -> List[str]:
+        resolved: Dict[str, None] = {}
+        for i, entry in enumerate(self.entries):
+            if entry.startswith("!"):
+                continue
+            elif i in self.glob_entry_indices:
+                # Deepest paths first, so renaming or removing a dir never invalidates the paths of its matched children
+                for relative_path in sorted(matches.get(i, []), key=lambda path: (-path.count("/"), path)):
+                    resolved[relative_path] = None
+            else:
+                resolved[entry] = None
+        return [relative_path for relative_path in resolved.keys() if not self.is_excluded(relative_path)]
+
+
+def resolve_path_pattern_lists(base_dir_path: Path, path_pattern_lists: Dict[str, PathPatternList]) -> Dict[str, List[str]]:
+    glob_path_pattern_lists = {name: path_pattern_list for name, path_pattern_list in path_pattern_lists.items() if path_pattern_list.has_globs()}
+    matches: Dict[str, Dict[int, List[str]]] = {name: {} for name in glob_path_pattern_lists.keys()}
+
+    def match_all(relative_path: str, is_dir: bool) -> None:
+        for name, path_pattern_list in glob_path_pattern_lists.items():
+            if path_pattern_list.match_dirs == is_dir:
+                i = path_pattern_list.match(relative_path)
+                if i is not None:
+                    matches[name].setdefault(i, []).append(relative_path)
+
+    # A single walk serves all pattern lists, no matter how many patterns they contain
+    if glob_path_pattern_lists:
+        for dir_path, dir_names, file_names in os.walk(base_dir_path):
+            relative_dir_path = Path(dir_path).relative_to(base_dir_path).as_posix()
+            prefix = "" if relative_dir_path == "." else relative_dir_path + "/"
+            if not prefix:
+                dir_names[:] = [dir_name for dir_name in dir_names if dir_name not in DEFAULT_EXCLUDED_DIRS]
+            for dir_name in dir_names:
+                match_all(prefix + dir_name, True)
+            for file_name in file_names:
+                match_all(prefix + file_name, False)
+
+    return {name: path_pattern_list.resolve(matches.get(name, {})) for name, path_pattern_list in path_pattern_lists.items()}
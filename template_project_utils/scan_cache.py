@@ -0,0 +1,114 @@
+# Copyright (C) 2024 twyleg
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import List, Tuple, Type
+
+from template_project_utils.match_index import FileMatches
+
+
+logm = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 100_000
+
+# Files modified this recently might still change within the same mtime tick without changing their size,
+# so their results are not cached (like git's racy index entries).
+RACY_INTERVAL_NS = 2 * 1000 * 1000 * 1000
+
+SCHEMA_VERSION = 2
+
+
+def default_scan_cache_file_path() -> Path:
+    cache_dir_path = Path(os.environ["XDG_CACHE_HOME"]) if os.environ.get("XDG_CACHE_HOME") else Path.home() / ".cache"
+    return cache_dir_path / "template_project_utils" / "scan_cache.sqlite3"
+
+
+class ScanCache:
+    # Cached result of a file that was skipped as binary. Skips due to the size limit depend on the settings and aren't cached.
+    BINARY = "binary"
+
+    def __init__(self, cache_file_path: Path, keywords: List[str], max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.cache_file_path = cache_file_path
+        self.keywords = keywords
+        self.keywords_hash = hashlib.sha256(json.dumps(sorted(set(keywords))).encode()).hexdigest()
+        self.max_entries = max_entries
+        self.now_ns = time.time_ns()
+        self.hits = 0
+        self.misses = 0
+        self._used_keys: List[Tuple[int, str, str]] = []
+        self._connection = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.cache_file_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            return self._open_database()
+        except sqlite3.DatabaseError as e:
+            logm.warning('Recreating broken scan cache "%s": %s', self.cache_file_path, e)
+            self.cache_file_path.unlink(missing_ok=True)
+            return self._open_database()
+
+    def _open_database(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.cache_file_path)
+        try:
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                connection.execute("DROP TABLE IF EXISTS entries")
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "path TEXT, keywords_hash TEXT, inode INTEGER, size INTEGER, mtime_ns INTEGER, result TEXT, last_used INTEGER, "
+                "PRIMARY KEY (path, keywords_hash))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        except BaseException:
+            # Otherwise the broken file stays open (and locked on Windows) while it is recreated
+            connection.close()
+            raise
+        return connection
+
+    def get(self, path: str, stat_result: os.stat_result) -> FileMatches | str | None:
+        row = self._connection.execute(
+            "SELECT inode, size, mtime_ns, result FROM entries WHERE path = ? AND keywords_hash = ?", (path, self.keywords_hash)
+        ).fetchone()
+        if row is None or tuple(row[:3]) != (stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used_keys.append((self.now_ns, path, self.keywords_hash))
+        return self.BINARY if row[3] == self.BINARY else FileMatches.from_dict(json.loads(row[3]), self.keywords)
+
+    def put(self, path: str, stat_result: os.stat_result, result: FileMatches | str) -> None:
+        if stat_result.st_mtime_ns > self.now_ns - RACY_INTERVAL_NS:
+            return
+        self._connection.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                self.keywords_hash,
+                stat_result.st_ino,
+                stat_result.st_size,
+                stat_result.st_mtime_ns,
+                json.dumps(result.to_dict()) if isinstance(result, FileMatches) else result,
+                self.now_ns,
+            ),
+        )
+
+    def close(self) -> None:
+        # Hits refresh their entries, then the least recently used entries above the limit are evicted
+        self._connection.executemany("UPDATE entries SET last_used = ? WHERE path = ? AND keywords_hash = ?", self._used_keys)
+        self._connection.execute(
+            "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,)
+        )
+        self._connection.commit()
+        self._connection.close()
+        logm.debug("Scan cache: %d hits, %d misses", self.hits, self.misses)
+
+    def __enter__(self) -> "ScanCache":
+        return self
+
+    def __exit__(self, exc_type: Type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None) -> None:
+        self.close()
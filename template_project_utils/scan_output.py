@@ -0,0 +1,61 @@
+# Copyright (C) 2024 twyleg
+import json
+from typing import Any, Dict, List, TextIO
+
+from template_project_utils.match_index import FileMatches
+
+
+class NdjsonScanOutput:
+    # Writes one JSON record per line while the scan is running: a record per keyword found in a path name or file
+    # content, one per skipped file and a summary at the end of each scan. Updates of a previous scan (watch mode)
+    # first write a removal record per path whose earlier records are obsolete, followed by its new records.
+    # Every record is flushed right away, so consumers can process them before the scan is done and nothing is buffered here.
+
+    def __init__(self, stream: TextIO, scan_name: str = "scan") -> None:
+        self.stream = stream
+        self.scan_name = scan_name
+
+    def begin(self, scan_name: str) -> None:
+        self.scan_name = scan_name
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps({"scan": self.scan_name, **record}, separators=(",", ":")) + "\n")
+        self.stream.flush()
+
+    def name_match(self, relative_path: str, is_dir: bool, keywords: List[str]) -> None:
+        for keyword in keywords:
+            self._write({"type": "dir_name" if is_dir else "file_name", "path": relative_path, "keyword": keyword})
+
+    def content_match(self, relative_path: str, file_matches: FileMatches) -> None:
+        locations: Dict[str, List[List[int]]] = {}
+        for keyword, _, line, column in file_matches.iter_counted():
+            locations.setdefault(keyword, []).append([line, column])
+        for keyword, keyword_locations in locations.items():
+            self._write({"type": "content", "path": relative_path, "keyword": keyword, "count": len(keyword_locations), "locations": keyword_locations})
+
+    def skipped(self, relative_path: str, reason: str) -> None:
+        self._write({"type": "skipped", "path": relative_path, "reason": reason})
+
+    def removed(self, relative_path: str) -> None:
+        self._write({"type": "removed", "path": relative_path})
+
+    def summary(
+        self,
+        file_name_count: Dict[str, int],
+        dir_name_count: Dict[str, int],
+        file_content_count: Dict[str, int],
+        skipped_binary_files: int,
+        skipped_large_files: int,
+        empty: bool,
+    ) -> None:
+        self._write(
+            {
+                "type": "summary",
+                "file_name_count": file_name_count,
+                "dir_name_count": dir_name_count,
+                "file_content_count": file_content_count,
+                "skipped_binary_files": skipped_binary_files,
+                "skipped_large_files": skipped_large_files,
+                "empty": empty,
+            }
+        )
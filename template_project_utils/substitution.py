@@ -0,0 +1,145 @@
+# Copyright (C) 2024 twyleg
+import logging
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import IO, Callable, Dict
+
+from template_project_utils.atomic_file import atomic_write
+from template_project_utils.match_index import FileMatches
+from template_project_utils.text_encoding import DEFAULT_ENCODING, MAX_BOM_LENGTH, EncodedKeywords, detect_encoding
+
+
+logm = logging.getLogger(__name__)
+
+DEFAULT_STREAMING_THRESHOLD = 16 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class Substitution:
+
+    def __init__(
+        self,
+        placeholder_target_dict: Dict[str, str],
+        streaming_threshold: int = DEFAULT_STREAMING_THRESHOLD,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        if not placeholder_target_dict:
+            raise ValueError("At least one placeholder target pair is required")
+
+        self.placeholder_target_dict = placeholder_target_dict
+        self.streaming_threshold = streaming_threshold
+        self.chunk_size = chunk_size
+
+        # Longest placeholders first, so overlapping placeholders (e.g. "template_project_python" and "template_project")
+        # always resolve to the longest match instead of depending on the config order.
+        placeholders = sorted(placeholder_target_dict.keys(), key=lambda placeholder: (-len(placeholder), placeholder))
+        self.pattern = re.compile("|".join(re.escape(placeholder) for placeholder in placeholders))
+
+        # Placeholders and targets are encoded once per supported encoding, so files are matched and rewritten
+        # as raw bytes without decoding. Line endings and BOMs are preserved as they are.
+        self.encoded_placeholders = EncodedKeywords(placeholders)
+        self.encoded_targets: Dict[str, Dict[bytes, bytes]] = {
+            encoding: {encoded_placeholder: placeholder_target_dict[placeholder].encode(encoding) for encoded_placeholder, placeholder in encoded.items()}
+            for encoding, encoded in self.encoded_placeholders.encoded.items()
+        }
+
+        # A placeholder crossing a chunk boundary is at most one byte shorter than the longest encoded placeholder,
+        # so this many bytes are carried over into the next chunk.
+        self.overlap = self.encoded_placeholders.max_length - 1
+
+    def _target_for_match(self, match: re.Match) -> str:
+        return self.placeholder_target_dict[match.group(0)]
+
+    def _bytes_target_replacer(self, encoding: str, bom_length: int, offset: int) -> Callable[[re.Match[bytes]], bytes]:
+        encoded_targets = self.encoded_targets[encoding]
+
+        def target_for_match(match: re.Match[bytes]) -> bytes:
+            # Matches not starting at a code unit boundary (e.g. odd offsets in UTF-16) are no real placeholders
+            if not EncodedKeywords.is_aligned(encoding, bom_length, offset + match.start()):
+                return match.group(0)
+            return encoded_targets[match.group(0)]
+
+        return target_for_match
+
+    def replace(self, text: str) -> str:
+        return self.pattern.sub(self._target_for_match, text)
+
+    def replace_bytes(self, data: bytes, encoding: str = DEFAULT_ENCODING, bom_length: int = 0, offset: int = 0) -> bytes:
+        return self.encoded_placeholders.patterns[encoding].sub(self._bytes_target_replacer(encoding, bom_length, offset), data)
+
+    def replace_bytes_at_matches(self, data: bytes, file_matches: FileMatches) -> bytes | None:
+        # Known match offsets from a scan are applied without searching the data again. The leftmost and then longest
+        # placeholder wins, like with the regex. If the data doesn't match the offsets anymore, None is returned.
+        encoding = file_matches.encoding
+        encoded_placeholders = {placeholder: encoded_placeholder for encoded_placeholder, placeholder in self.encoded_placeholders.encoded[encoding].items()}
+        encoded_targets = self.encoded_targets[encoding]
+        parts = []
+        end = 0
+        for placeholder, offset, _, _ in sorted(file_matches, key=lambda match: (match[1], -len(match[0]))):
+            encoded_placeholder = encoded_placeholders.get(placeholder)
+            if encoded_placeholder is None or offset < end:
+                continue
+            if data[offset : offset + len(encoded_placeholder)] != encoded_placeholder:
+                return None
+            parts.append(data[end:offset])
+            parts.append(encoded_targets[encoded_placeholder])
+            end = offset + len(encoded_placeholder)
+        parts.append(data[end:])
+        return b"".join(parts)
+
+    def replace_stream(self, src: IO[bytes], dst: IO[bytes]) -> None:
+        pending = src.read(MAX_BOM_LENGTH)
+        encoding, bom_length = detect_encoding(pending)
+        pattern = self.encoded_placeholders.patterns[encoding]
+        offset = 0
+        while chunk := src.read(self.chunk_size):
+            buffer = pending + chunk
+            safe_end = len(buffer) - self.overlap
+            target_for_match = self._bytes_target_replacer(encoding, bom_length, offset)
+            pos = 0
+            for match in pattern.finditer(buffer):
+                # Matches starting in the overlap window might be cut off or shadowed by a longer placeholder,
+                # they are handled with the next chunk.
+                if match.start() >= safe_end:
+                    break
+                dst.write(buffer[pos : match.start()])
+                dst.write(target_for_match(match))
+                pos = match.end()
+            cut = max(pos, safe_end)
+            dst.write(buffer[pos:cut])
+            pending = buffer[cut:]
+            offset += cut
+        dst.write(self.replace_bytes(pending, encoding, bom_length, offset))
+
+    def replace_in_file_streaming(self, filepath: Path) -> None:
+        with open(filepath, "rb") as src, atomic_write(filepath, "wb") as dst:
+            self.replace_stream(src, dst)
+
+    def contains_placeholder(self, filepath: Path) -> bool:
+        with open(filepath, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                encoding, bom_length = detect_encoding(buffer[:MAX_BOM_LENGTH])
+                for match in self.encoded_placeholders.patterns[encoding].finditer(buffer):
+                    if EncodedKeywords.is_aligned(encoding, bom_length, match.start()):
+                        return True
+                return False
+
+    def replace_in_file(self, filepath: Path, check: bool = True, file_matches: FileMatches | None = None) -> bool:
+        if check and not file_matches and not self.contains_placeholder(filepath):
+            return False
+        elif filepath.stat().st_size > self.streaming_threshold:
+            logm.debug("Streaming replacement for large file: %s", filepath)
+            self.replace_in_file_streaming(filepath)
+        else:
+            data = filepath.read_bytes()
+            replaced_data = self.replace_bytes_at_matches(data, file_matches) if file_matches else None
+            if replaced_data is None:
+                encoding, bom_length = detect_encoding(data[:MAX_BOM_LENGTH])
+                replaced_data = self.replace_bytes(data, encoding, bom_length)
+            with atomic_write(filepath, "wb") as dst:
+                dst.write(replaced_data)
+        return True
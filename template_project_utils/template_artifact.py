@@ -0,0 +1,89 @@
+# Copyright (C) 2024 twyleg
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+from template_project_utils.keyword_scanner import KeywordScanner
+from template_project_utils.operation_plan import OperationPlan
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: Path) -> str:
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+class TemplateArtifact:
+    # Everything the initialization learns about a template that doesn't depend on the targets: the plan compiled
+    # without targets (files to update, paths to rename, paths to remove) and the scan results with the offsets of all
+    # placeholders. It is only valid as long as the hashes of all files of the template are unchanged.
+    VERSION = 2
+
+    def __init__(
+        self,
+        placeholders: List[str],
+        auto: bool,
+        scan_settings: Dict[str, Any],
+        file_hashes: Dict[str, str],
+        scan_results: KeywordScanner.ScanResults,
+        compiled_plan: OperationPlan,
+    ) -> None:
+        self.placeholders = placeholders
+        self.auto = auto
+        self.scan_settings = scan_settings
+        self.file_hashes = file_hashes
+        self.scan_results = scan_results
+        self.compiled_plan = compiled_plan
+
+    @classmethod
+    def hash_files(cls, keyword_scanner: KeywordScanner) -> Dict[str, str]:
+        return {relative_path: hash_file(keyword_scanner.scan_base_dir_path / relative_path) for relative_path in keyword_scanner.list_files()}
+
+    def is_valid(self, placeholders: List[str], auto: bool, keyword_scanner: KeywordScanner) -> bool:
+        # Files are listed like they are by the scan, so added and removed files invalidate the artifact too
+        if placeholders != self.placeholders or auto != self.auto or keyword_scanner.settings() != self.scan_settings:
+            return False
+        relative_paths = keyword_scanner.list_files()
+        if set(relative_paths) != self.file_hashes.keys():
+            return False
+        return all(hash_file(keyword_scanner.scan_base_dir_path / relative_path) == self.file_hashes[relative_path] for relative_path in relative_paths)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.VERSION,
+            "placeholders": self.placeholders,
+            "auto": self.auto,
+            "scan_settings": self.scan_settings,
+            "file_hashes": self.file_hashes,
+            "scan_results": self.scan_results.to_dict(),
+            "compiled_plan": self.compiled_plan.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, artifact_dict: Dict[str, Any]) -> "TemplateArtifact":
+        if artifact_dict.get("version") != cls.VERSION:
+            raise RuntimeError(f"Unsupported template artifact version: {artifact_dict.get('version')}")
+        placeholders = artifact_dict["placeholders"]
+        return cls(
+            placeholders,
+            artifact_dict["auto"],
+            artifact_dict["scan_settings"],
+            artifact_dict["file_hashes"],
+            KeywordScanner.ScanResults.from_dict(artifact_dict["scan_results"], placeholders),
+            OperationPlan.from_dict(artifact_dict["compiled_plan"]),
+        )
+
+    def save(self, artifact_file_path: Path) -> None:
+        with open(artifact_file_path, "w") as artifact_file:
+            json.dump(self.to_dict(), artifact_file, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, artifact_file_path: Path) -> "TemplateArtifact":
+        with open(artifact_file_path, "r") as artifact_file:
+            return cls.from_dict(json.load(artifact_file))
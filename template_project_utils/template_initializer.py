@@ -1,13 +1,17 @@
 # Copyright (C) 2024 twyleg
-import fileinput
+import functools
 import logging
 import os
-import shutil
 import yaml
 import jsonschema
 import json
-import template_project_utils.git as git
-from typing import Dict, List, Any
+from template_project_utils.case_variants import PlaceholderVariants
+from template_project_utils.keyword_matcher import KeywordMatcher
+from template_project_utils.keyword_scanner import KeywordScanner
+from template_project_utils.operation_plan import OperationPlan, OperationPlanExecutor, DEFAULT_ASYNC_CONCURRENCY
+from template_project_utils.path_patterns import PathPatternList, resolve_path_pattern_lists
+from template_project_utils.substitution import Substitution, DEFAULT_STREAMING_THRESHOLD
+from typing import Any, Dict, List, Tuple
 from InquirerPy import inquirer
 from pathlib import Path
 
@@ -16,13 +20,38 @@ FILE_DIR = Path(__file__).parent
 
 logm = logging.getLogger(__name__)
 
+PATH_CONFIG_NAMES = ["update_files", "rename_files", "rename_dirs", "remove_files", "remove_dirs"]
+
+
+def _contains_placeholder(placeholder_check: Substitution, working_dir_path: Path, file_to_check: str) -> bool:
+    return placeholder_check.contains_placeholder(working_dir_path / file_to_check)
+
 
 class TemplateInitializer:
+    ExecutorType = OperationPlanExecutor.ExecutorType
 
-    def __init__(self, config_file_or_dir_path: Path, working_dir_path: Path | None = None, dry_run=False):
+    def __init__(
+        self,
+        config_file_or_dir_path: Path,
+        working_dir_path: Path | None = None,
+        dry_run=False,
+        streaming_threshold: int = DEFAULT_STREAMING_THRESHOLD,
+        jobs: int = 1,
+        executor_type: OperationPlanExecutor.ExecutorType = OperationPlanExecutor.ExecutorType.THREAD,
+        async_concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+        durable: bool = False,
+    ):
         self.config_file_path = config_file_or_dir_path if not config_file_or_dir_path.is_dir() else config_file_or_dir_path / "template_config.yaml"
         self.working_dir_path = working_dir_path if working_dir_path else self.config_file_path.parent
         self.dry_run = dry_run
+        self.executor = OperationPlanExecutor(
+            dry_run=dry_run,
+            streaming_threshold=streaming_threshold,
+            jobs=jobs,
+            executor_type=executor_type,
+            async_concurrency=async_concurrency,
+            durable=durable,
+        )
 
         if not self.config_file_path.exists():
             raise RuntimeError(f"Config file does not exist: {self.config_file_path}")
@@ -37,12 +66,27 @@ class TemplateInitializer:
             config_schema = json.load(config_schema_file)
             jsonschema.validate(instance=self.config, schema=config_schema)
 
-        self.placeholder_target_dict: Dict[str, str | None] = {placeholder: None for placeholder in self.config["placeholder"]}
+        self.placeholder_variants = PlaceholderVariants(self.config["placeholder"])
+        self.placeholder_target_dict: Dict[str, str | None] = {placeholder: None for placeholder in self.placeholder_variants.names()}
+        # All placeholders including the case variants, as they are searched for in the project
+        self.placeholders: List[str] = list(self.placeholder_variants.placeholders.keys())
         self.files_to_update: List[str] | None = self.config["update_files"]
         self.files_to_rename: List[str] | None = self.config["rename_files"]
         self.dirs_to_rename: List[str] | None = self.config["rename_dirs"]
         self.files_to_remove: List[str] | None = self.config["remove_files"]
         self.dirs_to_remove: List[str] | None = self.config["remove_dirs"]
+        self.max_scan_file_size: int | None = self.config.get("max_scan_file_size")
+
+        # Entries may be glob patterns (e.g. "src/**/*.py", "!**/vendor/**"), which are compiled once here
+        # and resolved against the working dir in a single walk per run.
+        self.path_pattern_lists: Dict[str, PathPatternList] = {
+            name: PathPatternList(entries, match_dirs=name in ("rename_dirs", "remove_dirs"))
+            for name, entries in zip(
+                PATH_CONFIG_NAMES,
+                [self.files_to_update, self.files_to_rename, self.dirs_to_rename, self.files_to_remove, self.dirs_to_remove],
+            )
+            if entries is not None
+        }
 
     @classmethod
     def _load_config(cls, config_path: Path) -> Dict[str, Any]:
@@ -51,98 +95,214 @@ class TemplateInitializer:
 
     @classmethod
     def replace_string_in_file(cls, filepath: Path, text_to_search: str, replacement_text: str) -> None:
-        with fileinput.FileInput(filepath, inplace=True) as file:
-            for line in file:
-                print(line.replace(text_to_search, replacement_text), end="")
-
-    def _update_files(self) -> None:
-        logm.info("Updating files:")
-        if self.files_to_update is None:
-            logm.info("  Nothing!")
-        else:
-            for file_to_update in self.files_to_update:
-                for placeholder, target in self.placeholder_target_dict.items():
-                    logm.info("  %s: %s -> %s", file_to_update, placeholder, target)
-                    if not self.dry_run:
-                        assert target
-                        self.replace_string_in_file(Path(file_to_update), placeholder, target)
-
-    def _rename_files(self) -> None:
-        logm.info("Renaming files:")
-        if self.files_to_rename is None:
-            logm.info("  Nothing!")
-        else:
-            for file_to_rename in self.files_to_rename:
-                for placeholder, target in self.placeholder_target_dict.items():
-                    logm.debug('  Placeholder: "%s", Target: "%s"', placeholder, target)
-                    if placeholder in file_to_rename:
-                        assert target
-                        rename_file_path = Path(file_to_rename)
-                        new_file_name = rename_file_path.name.replace(placeholder, target)
-                        new_file_path = rename_file_path.parent / new_file_name
-                        logm.info("  %s -> %s", rename_file_path, new_file_path)
-                        if not self.dry_run:
-                            shutil.move(rename_file_path, new_file_path)
-
-    def _rename_dirs(self) -> None:
-        logm.info("Renaming dirs:")
-        if self.dirs_to_rename is None:
-            logm.info("  Nothing!")
-        else:
-            for dir_to_rename in self.dirs_to_rename:
-                for placeholder, target in self.placeholder_target_dict.items():
-                    logm.debug('  Placeholder: "%s", Target: "%s"', placeholder, target)
-                    if placeholder in dir_to_rename:
-                        assert target
-                        rename_dir_path = Path(dir_to_rename)
-                        new_dir_name = rename_dir_path.name.replace(placeholder, target)
-                        new_dir_path = rename_dir_path.parent / new_dir_name
-                        logm.info("  %s -> %s", rename_dir_path, new_dir_path)
-                        if not self.dry_run:
-                            shutil.move(rename_dir_path, new_dir_path)
-
-    def _remove_files(self) -> None:
-        logm.info("Removing files:")
-        if self.files_to_remove is None:
-            logm.info("  Nothing!")
-        else:
-            for file_to_remove in self.files_to_remove:
-                logm.info("  %s", file_to_remove)
-                if not self.dry_run:
-                    os.remove(file_to_remove)
-
-    def _remove_dirs(self) -> None:
-        logm.info("Removing dirs:")
-        if self.dirs_to_remove is None:
-            logm.info("  Nothing!")
-        else:
-            for dir_to_remove in self.dirs_to_remove:
-                logm.info("  %s", dir_to_remove)
-                if not self.dry_run:
-                    shutil.rmtree(dir_to_remove, ignore_errors=True)
-
-    def init(self, placeholder_target_dict: Dict[str, str] = {}) -> None:
-
-        def read_target_for_placeholder_from_user_input(placeholder: str) -> str:
-            return inquirer.text(message=f'Target name for "{placeholder}":').execute()
-
-        logm.info("Change directory: %s", self.working_dir_path)
-        os.chdir(self.working_dir_path)
-
-        for placeholder, target in self.placeholder_target_dict.items():
+        cls.replace_strings_in_file(filepath, {text_to_search: replacement_text})
+
+    @classmethod
+    def replace_strings_in_file(cls, filepath: Path, placeholder_target_dict: Dict[str, str]) -> None:
+        Substitution(placeholder_target_dict).replace_in_file(filepath)
+
+    def _read_placeholder_target_dict(self, placeholder_target_dict: Dict[str, str]) -> Dict[str, str]:
+        read_placeholder_target_dict: Dict[str, str] = {}
+        for placeholder in self.placeholder_target_dict.keys():
+            if placeholder in placeholder_target_dict:
+                read_placeholder_target_dict[placeholder] = placeholder_target_dict[placeholder]
+                logm.info('Target name from arguments for "%s": "%s"', placeholder, placeholder_target_dict[placeholder])
+            else:
+                target = inquirer.text(message=f'Target name for "{placeholder}":').execute()
+                read_placeholder_target_dict[placeholder] = target
+                logm.info('Target name from user input for "%s": "%s"', placeholder, target)
+        return read_placeholder_target_dict
+
+    async def _aread_placeholder_target_dict(self, placeholder_target_dict: Dict[str, str]) -> Dict[str, str]:
+        read_placeholder_target_dict: Dict[str, str] = {}
+        for placeholder in self.placeholder_target_dict.keys():
             if placeholder in placeholder_target_dict:
-                target = placeholder_target_dict[placeholder]
-                self.placeholder_target_dict[placeholder] = target
-                logm.info('Target name from arguments for "%s": "%s"', placeholder, target)
+                read_placeholder_target_dict[placeholder] = placeholder_target_dict[placeholder]
+                logm.info('Target name from arguments for "%s": "%s"', placeholder, placeholder_target_dict[placeholder])
             else:
-                target = read_target_for_placeholder_from_user_input(placeholder)
-                self.placeholder_target_dict[placeholder] = target
+                target: str = await inquirer.text(message=f'Target name for "{placeholder}":').execute_async()  # type: ignore[func-returns-value, assignment]
+                read_placeholder_target_dict[placeholder] = target
                 logm.info('Target name from user input for "%s": "%s"', placeholder, target)
+        return read_placeholder_target_dict
+
+    @classmethod
+    def _add_discovered_paths(cls, resolved_paths: Dict[str, List[str] | None], scan_results: KeywordScanner.ScanResults) -> None:
+        files_to_remove = set(resolved_paths["remove_files"] or [])
+        dirs_to_remove = resolved_paths["remove_dirs"] or []
+
+        def is_removed(path: str) -> bool:
+            return path in files_to_remove or any(path == d or path.startswith(d.rstrip("/") + "/") for d in dirs_to_remove)
+
+        for name, discovered_paths in [
+            ("update_files", scan_results.files_with_keyword_in_content),
+            ("rename_files", scan_results.files_with_keyword_in_name),
+            ("rename_dirs", scan_results.dirs_with_keyword_in_name),
+        ]:
+            paths = dict.fromkeys(resolved_paths[name] or [])
+            paths.update(dict.fromkeys(path for path in discovered_paths if not is_removed(path)))
+            resolved_paths[name] = list(paths.keys())
+
+        # Deepest dirs first, so renaming a dir never invalidates the path of another dir to rename
+        resolved_paths["rename_dirs"] = sorted(resolved_paths["rename_dirs"] or [], key=lambda path: -path.rstrip("/").count("/"))
+
+    def resolve_paths(self, working_dir_path: Path | None = None, scan_results: KeywordScanner.ScanResults | None = None) -> Dict[str, List[str] | None]:
+        working_dir_path = working_dir_path if working_dir_path else self.working_dir_path
+        resolved_paths: Dict[str, List[str] | None] = {name: None for name in PATH_CONFIG_NAMES}
+        resolved_paths.update(resolve_path_pattern_lists(working_dir_path, self.path_pattern_lists))
+
+        # Auto discovery: everything the keyword scan found is added to the work lists, except paths that get removed anyway
+        if scan_results:
+            self._add_discovered_paths(resolved_paths, scan_results)
+
+        if scan_results or any(path_pattern_list.has_globs() for path_pattern_list in self.path_pattern_lists.values()):
+            log = logm.info if self.dry_run else logm.debug
+            log("Resolved paths:")
+            for name, paths in resolved_paths.items():
+                log("  %s: %s", name, paths)
+        return resolved_paths
+
+    @classmethod
+    def _path_stats(cls, path: Path) -> Tuple[int, int]:
+        if path.is_file():
+            return 1, path.stat().st_size
+        files = 0
+        size = 0
+        for dir_path, _, file_names in os.walk(path):
+            for file_name in file_names:
+                files += 1
+                size += (Path(dir_path) / file_name).stat().st_size
+        return files, size
+
+    def compile_plan(self, working_dir_path: Path | None = None, scan_results: KeywordScanner.ScanResults | None = None) -> OperationPlan:
+        # All operations that don't depend on the targets, so the plan can be compiled once and used for any targets.
+        # Renames are included for all paths with a placeholder in their name, without their target paths yet.
+        working_dir_path = working_dir_path if working_dir_path else self.working_dir_path
+        paths = self.resolve_paths(working_dir_path, scan_results)
+        files_known_to_match = set(scan_results.files_with_keyword_in_content) if scan_results else set()
+        name_keyword_matcher = KeywordMatcher(self.placeholders)
+        compiled_plan = OperationPlan({})
+
+        # Files without placeholders are left out of the plan, so executing it only rewrites what actually changes.
+        # Without any placeholders (templates that only remove files), no file is checked at all.
+        files_to_update = paths["update_files"] or []
+        checked_files: Dict[str, bool] = {}
+        if self.placeholders:
+            placeholder_check = Substitution({placeholder: placeholder for placeholder in self.placeholders})
+            files_to_check = [file_to_update for file_to_update in files_to_update if file_to_update not in files_known_to_match]
+            checked_files = dict(
+                zip(files_to_check, self.executor.map_blocking(functools.partial(_contains_placeholder, placeholder_check, working_dir_path), files_to_check))
+            )
+        for file_to_update in files_to_update:
+            if file_to_update in files_known_to_match or checked_files.get(file_to_update, False):
+                compiled_plan.add(OperationPlan.OperationType.UPDATE_FILE, file_to_update, files=1, bytes=(working_dir_path / file_to_update).stat().st_size)
+            else:
+                compiled_plan.skipped_files.append(file_to_update)
+
+        for operation_type, paths_to_rename in [
+            (OperationPlan.OperationType.RENAME_FILE, paths["rename_files"] or []),
+            (OperationPlan.OperationType.RENAME_DIR, paths["rename_dirs"] or []),
+        ]:
+            for path_to_rename in paths_to_rename:
+                if name_keyword_matcher.matches(Path(path_to_rename).name):
+                    files, size = self._path_stats(working_dir_path / path_to_rename)
+                    compiled_plan.add(operation_type, path_to_rename, files=files, bytes=size)
+
+        for operation_type, paths_to_remove in [
+            (OperationPlan.OperationType.REMOVE_FILE, paths["remove_files"] or []),
+            (OperationPlan.OperationType.REMOVE_DIR, paths["remove_dirs"] or []),
+        ]:
+            for path_to_remove in paths_to_remove:
+                files, size = self._path_stats(working_dir_path / path_to_remove)
+                compiled_plan.add(operation_type, path_to_remove, files=files, bytes=size)
+
+        compiled_plan.add(OperationPlan.OperationType.REMOVE_REMOTE, "origin")
+        return compiled_plan
+
+    @classmethod
+    def _apply_targets(cls, compiled_plan: OperationPlan, placeholder_target_dict: Dict[str, str]) -> OperationPlan:
+        # Renames only exist for names with placeholders, so there is nothing to substitute without them
+        substitution = Substitution(placeholder_target_dict) if placeholder_target_dict else None
+        plan = OperationPlan(placeholder_target_dict)
+        plan.skipped_files = list(compiled_plan.skipped_files)
+        for operation in compiled_plan.operations:
+            if operation.type in (OperationPlan.OperationType.RENAME_FILE, OperationPlan.OperationType.RENAME_DIR):
+                rename_path = Path(operation.path)
+                new_name = substitution.replace(rename_path.name) if substitution else rename_path.name
+                if new_name != rename_path.name:
+                    plan.add(operation.type, operation.path, (rename_path.parent / new_name).as_posix(), operation.files, operation.bytes)
+            else:
+                plan.add(operation.type, operation.path, operation.target_path, operation.files, operation.bytes)
+        return plan
+
+    def _create_plan(
+        self,
+        placeholder_target_dict: Dict[str, str],
+        working_dir_path: Path,
+        scan_results: KeywordScanner.ScanResults | None = None,
+        compiled_plan: OperationPlan | None = None,
+    ) -> OperationPlan:
+        assert all(placeholder_target_dict.values())
+        if compiled_plan is None:
+            compiled_plan = self.compile_plan(working_dir_path, scan_results)
+        return self._apply_targets(compiled_plan, placeholder_target_dict)
+
+    def plan(
+        self,
+        placeholder_target_dict: Dict[str, str] = {},
+        *,
+        working_dir_path: Path | None = None,
+        scan_results: KeywordScanner.ScanResults | None = None,
+        compiled_plan: OperationPlan | None = None,
+    ) -> OperationPlan:
+        working_dir_path = working_dir_path if working_dir_path else self.working_dir_path
+        read_placeholder_target_dict = self._read_placeholder_target_dict(placeholder_target_dict)
+        return self._create_plan(self.placeholder_variants.expand(read_placeholder_target_dict), working_dir_path, scan_results, compiled_plan)
+
+    async def aplan(
+        self,
+        placeholder_target_dict: Dict[str, str] = {},
+        *,
+        working_dir_path: Path | None = None,
+        scan_results: KeywordScanner.ScanResults | None = None,
+        compiled_plan: OperationPlan | None = None,
+    ) -> OperationPlan:
+        working_dir_path = working_dir_path if working_dir_path else self.working_dir_path
+        read_placeholder_target_dict = await self._aread_placeholder_target_dict(placeholder_target_dict)
+        return await self.executor.run_blocking(
+            self._create_plan, self.placeholder_variants.expand(read_placeholder_target_dict), working_dir_path, scan_results, compiled_plan
+        )
+
+    def init(
+        self,
+        placeholder_target_dict: Dict[str, str] = {},
+        *,
+        working_dir_path: Path | None = None,
+        scan_results: KeywordScanner.ScanResults | None = None,
+        compiled_plan: OperationPlan | None = None,
+    ) -> OperationPlan:
+        # With a compiled plan, the scan results only provide the match offsets of the files to update
+        working_dir_path = working_dir_path if working_dir_path else self.working_dir_path
+        logm.info("Change directory: %s", working_dir_path)
+        os.chdir(working_dir_path)
+
+        plan = self.plan(placeholder_target_dict, working_dir_path=working_dir_path, scan_results=scan_results, compiled_plan=compiled_plan)
+        self.placeholder_target_dict.update({placeholder: plan.placeholder_target_dict[placeholder] for placeholder in self.placeholder_target_dict})
+        self.executor.execute(plan, working_dir_path, scan_results.file_matches if scan_results else None)
+        return plan
 
-        self._update_files()
-        self._rename_files()
-        self._rename_dirs()
-        self._remove_files()
-        self._remove_dirs()
+    async def ainit(
+        self,
+        placeholder_target_dict: Dict[str, str] = {},
+        *,
+        working_dir_path: Path | None = None,
+        scan_results: KeywordScanner.ScanResults | None = None,
+        compiled_plan: OperationPlan | None = None,
+    ) -> OperationPlan:
+        # Unlike init(), the process wide working directory and the instance state are left untouched,
+        # so a single instance can initialize several working dirs concurrently.
+        working_dir_path = working_dir_path if working_dir_path else self.working_dir_path
+        logm.info("Working directory: %s", working_dir_path)
 
-        git.remove_remote(self.working_dir_path, "origin")
+        plan = await self.aplan(placeholder_target_dict, working_dir_path=working_dir_path, scan_results=scan_results, compiled_plan=compiled_plan)
+        await self.executor.aexecute(plan, working_dir_path, scan_results.file_matches if scan_results else None)
+        return plan
@@ -0,0 +1,137 @@
+# Copyright (C) 2024 twyleg
+import codecs
+import os
+import re
+from typing import Dict, List, Tuple
+
+from template_project_utils.keyword_matcher import KeywordMatcher
+from template_project_utils.match_index import FileMatches
+
+
+# Files without BOM are matched as UTF-8, which is byte identical to Latin-1 and
+# other ASCII compatible encodings for ASCII placeholders.
+DEFAULT_ENCODING = "utf-8"
+
+CODE_UNIT_SIZES: Dict[str, int] = {
+    "utf-8": 1,
+    "utf-16-le": 2,
+    "utf-16-be": 2,
+    "utf-32-le": 4,
+    "utf-32-be": 4,
+}
+
+# UTF-32 first, because the UTF-32-LE BOM starts with the UTF-16-LE BOM
+BOMS: List[Tuple[bytes, str]] = [
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+
+MAX_BOM_LENGTH = 4
+
+COUNT_CHUNK_SIZE = 1024 * 1024
+
+# Files are classified as binary by their first bytes only
+SNIFF_SIZE = 8 * 1024
+
+BINARY_MAGIC_NUMBERS: List[bytes] = [
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",  # JPEG
+    b"GIF87a",
+    b"GIF89a",
+    b"%PDF-",
+    b"PK\x03\x04",  # ZIP (also gerber archives, docx, jar, whl)
+    b"\x1f\x8b",  # GZIP
+    b"\xfd7zXZ\x00",
+    b"7z\xbc\xaf\x27\x1c",
+    b"\x7fELF",
+    b"\xcf\xfa\xed\xfe",  # Mach-O
+    b"\x00asm",
+]
+
+# Files with these extensions are skipped without reading them at all. Extensions also used for text files (e.g. .bin
+# for firmware sources, .obj for Wavefront models) are left to the content sniffing.
+# fmt: off
+BINARY_EXTENSIONS = {
+    ".7z", ".a", ".bmp", ".class", ".dll", ".dylib", ".exe", ".gif", ".gz", ".ico", ".jar", ".jpeg", ".jpg", ".lib", ".mp3", ".mp4",
+    ".o", ".otf", ".pdf", ".png", ".pyc", ".so", ".tgz", ".ttf", ".wav", ".whl", ".woff", ".woff2", ".xz", ".zip",
+}
+# fmt: on
+
+
+def detect_encoding(head: bytes) -> Tuple[str, int]:
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+    return DEFAULT_ENCODING, 0
+
+
+def has_binary_extension(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in BINARY_EXTENSIONS
+
+
+def is_binary(head: bytes, encoding: str) -> bool:
+    # NUL bytes are regular content of UTF-16/UTF-32 files, but a strong hint for binaries otherwise
+    if CODE_UNIT_SIZES[encoding] != 1:
+        return False
+    return b"\0" in head or any(head.startswith(magic_number) for magic_number in BINARY_MAGIC_NUMBERS)
+
+
+def _count_in_range(data: bytes, sub: bytes, start: int, end: int) -> int:
+    if isinstance(data, bytes):
+        return data.count(sub, start, end)
+    # mmap has no count(), slices are copied in bounded chunks instead. Chunks are a multiple of every code unit size,
+    # so an aligned sub never crosses a chunk boundary.
+    return sum(data[chunk_start : min(chunk_start + COUNT_CHUNK_SIZE, end)].count(sub) for chunk_start in range(start, end, COUNT_CHUNK_SIZE))
+
+
+class EncodedKeywords:
+
+    def __init__(self, keywords: List[str]) -> None:
+        self.keywords = keywords
+        self.encoded: Dict[str, Dict[bytes, str]] = {}
+        self.patterns: Dict[str, re.Pattern[bytes]] = {}
+        self.matchers: Dict[str, KeywordMatcher[bytes]] = {}
+        self.keyword_indices: Dict[str, Dict[bytes, int]] = {}
+
+        for encoding in CODE_UNIT_SIZES.keys():
+            encoded = {keyword.encode(encoding): keyword for keyword in keywords}
+            # Longest keywords first, so overlapping keywords always resolve to the longest match
+            encoded_keywords = sorted(encoded.keys(), key=lambda encoded_keyword: (-len(encoded_keyword), encoded_keyword))
+            self.encoded[encoding] = encoded
+            self.patterns[encoding] = re.compile(b"|".join(re.escape(encoded_keyword) for encoded_keyword in encoded_keywords))
+            self.matchers[encoding] = KeywordMatcher(encoded_keywords)
+            self.keyword_indices[encoding] = {encoded_keyword: keywords.index(keyword) for encoded_keyword, keyword in encoded.items()}
+
+        self.max_length = max((len(encoded_keyword) for encoded in self.encoded.values() for encoded_keyword in encoded.keys()), default=0)
+
+    @classmethod
+    def is_aligned(cls, encoding: str, bom_length: int, offset: int) -> bool:
+        return (offset - bom_length) % CODE_UNIT_SIZES[encoding] == 0
+
+    def count(self, data: bytes, encoding: str, bom_length: int) -> Dict[str, int]:
+        # All keywords are counted in a single pass over the data
+        encoded_keyword_count_dict = self.matchers[encoding].count(data, CODE_UNIT_SIZES[encoding], bom_length)
+        return {self.encoded[encoding][encoded_keyword]: count for encoded_keyword, count in encoded_keyword_count_dict.items()}
+
+    def find(self, data: bytes, encoding: str, bom_length: int) -> FileMatches:
+        file_matches = FileMatches(encoding, bom_length, self.keywords)
+        keyword_indices = self.keyword_indices[encoding]
+        code_unit_size = CODE_UNIT_SIZES[encoding]
+        newline = "\n".encode(encoding)
+
+        # Lines are counted incrementally between matches, so the data is passed only once
+        line = 1
+        line_start = bom_length
+        pos = bom_length
+        for start, encoded_keyword in self.matchers[encoding].iter_occurrences(data, code_unit_size, bom_length):
+            if start > pos:
+                newlines = _count_in_range(data, newline, pos, start)
+                if newlines:
+                    line += newlines
+                    line_start = data.rfind(newline, pos, start) + len(newline)
+                pos = start
+            file_matches.add(keyword_indices[encoded_keyword], start, line, (start - line_start) // code_unit_size + 1)
+        return file_matches
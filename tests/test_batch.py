@@ -0,0 +1,92 @@
+# Copyright (C) 2024 twyleg
+# fmt: off
+import jsonschema
+import pytest
+import yaml
+
+from pathlib import Path
+
+from template_project_utils.batch import BatchEntry, copy_template, load_batch_manifest
+from template_project_utils.keyword_scanner import KeywordScanner
+from template_project_utils.template_initializer import TemplateInitializer
+
+
+FILE_DIR = Path(__file__).parent
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    template_dir_path = tmp_path / "template"
+    (template_dir_path / "template_project").mkdir(parents=True)
+    (template_dir_path / "template_project" / "main.py").write_text("import template_project")
+    (template_dir_path / "logs").mkdir()
+    (template_dir_path / "logs" / "log.txt").write_text("log")
+    (template_dir_path / "template_config.yaml").write_text(yaml.safe_dump({
+        "placeholder": ["template_project"],
+        "update_files": ["template_project/main.py"],
+        "rename_files": None,
+        "rename_dirs": ["template_project"],
+        "remove_files": ["template_config.yaml"],
+        "remove_dirs": None,
+    }))
+    return template_dir_path
+
+
+class TestBatch:
+
+    def test_ManifestWithRelativeDestinations_LoadBatchManifest_DestinationsRelativeToManifest(self, tmp_path):
+        manifest_file_path = tmp_path / "manifests" / "manifest.yaml"
+        manifest_file_path.parent.mkdir()
+        manifest_file_path.write_text(yaml.safe_dump({"projects": [
+            {"destination": "../one", "placeholders": {"template_project": "one"}},
+            {"destination": "two"},
+        ]}))
+
+        assert load_batch_manifest(manifest_file_path, tmp_path / "template") == [
+            BatchEntry(tmp_path / "one", {"template_project": "one"}),
+            BatchEntry(tmp_path / "manifests" / "two", {}),
+        ]
+
+    def test_InvalidManifest_LoadBatchManifest_ValidationErrorRaised(self, tmp_path):
+        (tmp_path / "manifest.yaml").write_text(yaml.safe_dump({"projects": [{"placeholders": {"template_project": "one"}}]}))
+
+        with pytest.raises(jsonschema.ValidationError):
+            load_batch_manifest(tmp_path / "manifest.yaml", tmp_path / "template")
+
+    @pytest.mark.parametrize("destination", ["template", "template/out/one"])
+    def test_ManifestWithDestinationInsideOfTemplate_LoadBatchManifest_RuntimeErrorRaised(self, template_dir, tmp_path, destination):
+        (tmp_path / "manifest.yaml").write_text(yaml.safe_dump({"projects": [{"destination": destination}]}))
+
+        with pytest.raises(RuntimeError, match="inside of the template"):
+            load_batch_manifest(tmp_path / "manifest.yaml", template_dir)
+
+    def test_TemplateContainingExcludedPaths_CopyTemplate_ExcludedPathsNotCopied(self, template_dir, tmp_path):
+        (template_dir / "out" / "one").mkdir(parents=True)
+        (template_dir / "out" / "one" / "file.txt").write_text("template_project")
+
+        copy_template(template_dir, tmp_path / "copy", [template_dir / "out" / "one", tmp_path / "other"])
+
+        assert (tmp_path / "copy" / "out").is_dir()
+        assert not (tmp_path / "copy" / "out" / "one").exists()
+
+    def test_Template_CopyTemplate_CopiedWithoutLogsAndExistingDestinationRejected(self, template_dir, tmp_path):
+        copy_template(template_dir, tmp_path / "copy")
+
+        assert (tmp_path / "copy" / "template_project" / "main.py").read_text() == "import template_project"
+        assert not (tmp_path / "copy" / "logs").exists()
+        with pytest.raises(RuntimeError):
+            copy_template(template_dir, tmp_path / "copy")
+
+    def test_Template_InitializeCopiesWithOneInitializer_AllCopiesInitialized(self, template_dir, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        template_initializer = TemplateInitializer(template_dir)
+        keyword_scanner = KeywordScanner(template_dir, template_initializer.placeholders)
+        template_scan_results = keyword_scanner.scan()
+
+        for target in ["one", "two"]:
+            copy_template(template_dir, tmp_path / target)
+            plan = template_initializer.init({"template_project": target}, scan_results=template_scan_results, working_dir_path=tmp_path / target)
+
+            assert keyword_scanner.with_base_dir(tmp_path / target).scan_incremental(template_scan_results, plan).empty()
+            assert (tmp_path / target / target / "main.py").read_text() == f"import {target}"
+        assert (template_dir / "template_project" / "main.py").exists()
@@ -0,0 +1,69 @@
+# Copyright (C) 2024 twyleg
+# fmt: off
+import pytest
+
+from pathlib import Path
+
+from template_project_utils.case_variants import CaseVariant, PlaceholderVariants, split_words, to_case_variant
+
+
+FILE_DIR = Path(__file__).parent
+
+
+class TestCaseVariants:
+
+    @pytest.mark.parametrize("name", ["template_project_cpp", "template-project-cpp", "TemplateProjectCpp", "templateProjectCpp", "TEMPLATE_PROJECT_CPP"])
+    def test_NameInAnyCase_SplitWords_SameWords(self, name):
+        assert split_words(name) == ["template", "project", "cpp"]
+
+    def test_NameWithAcronymAndDigits_SplitWords_AcronymAndDigitsKept(self):
+        assert split_words("HTTPServer2_app") == ["http", "server2", "app"]
+
+    @pytest.mark.parametrize("name, expected", [
+        ("Müller Projekt", ["müller", "projekt"]),
+        ("MüllerProjekt", ["müller", "projekt"]),
+        ("café_élan", ["café", "élan"]),
+        ("my.project", ["my.project"]),
+        ("ΑλφαΒήτα", ["αλφα", "βήτα"]),
+    ])
+    def test_NameWithNonAsciiCharacters_SplitWords_NoCharactersLost(self, name, expected):
+        assert split_words(name) == expected
+
+    @pytest.mark.parametrize("case_variant, expected", [
+        (CaseVariant.SNAKE, "müller_projekt"),
+        (CaseVariant.KEBAB, "müller-projekt"),
+        (CaseVariant.CAMEL, "MüllerProjekt"),
+        (CaseVariant.LOWER_CAMEL, "müllerProjekt"),
+        (CaseVariant.UPPER, "MÜLLER_PROJEKT"),
+    ])
+    def test_NonAsciiName_ToCaseVariant_NameInCaseVariant(self, case_variant, expected):
+        assert to_case_variant("Müller Projekt", case_variant) == expected
+
+    @pytest.mark.parametrize("case_variant, expected", [
+        (CaseVariant.SNAKE, "my_cool_project"),
+        (CaseVariant.KEBAB, "my-cool-project"),
+        (CaseVariant.CAMEL, "MyCoolProject"),
+        (CaseVariant.LOWER_CAMEL, "myCoolProject"),
+        (CaseVariant.UPPER, "MY_COOL_PROJECT"),
+    ])
+    def test_Name_ToCaseVariant_NameInCaseVariant(self, case_variant, expected):
+        assert to_case_variant("my-cool project", case_variant) == expected
+
+    def test_PlaceholderWithVariants_Expand_TargetsInSameVariants(self):
+        placeholder_variants = PlaceholderVariants([
+            {"name": "template_project_cpp", "variants": ["snake", "kebab", "camel", "upper"]},
+            "plain",
+        ])
+
+        assert placeholder_variants.names() == ["template_project_cpp", "plain"]
+        assert placeholder_variants.expand({"template_project_cpp": "MyProject", "plain": "Target"}) == {
+            "template_project_cpp": "my_project",
+            "template-project-cpp": "my-project",
+            "TemplateProjectCpp": "MyProject",
+            "TEMPLATE_PROJECT_CPP": "MY_PROJECT",
+            "plain": "Target",
+        }
+
+    def test_PlaceholdersWithCollidingVariants_CreatePlaceholderVariants_RuntimeErrorRaised(self):
+        with pytest.raises(RuntimeError):
+            PlaceholderVariants([{"name": "template_project", "variants": ["kebab"]}, "template-project"])
@@ -0,0 +1,58 @@
+# Copyright (C) 2024 twyleg
+# fmt: off
+import sys
+import pytest
+
+from pathlib import Path
+
+from template_project_utils.file_watcher import InotifyWatcher
+from template_project_utils.keyword_scanner import KeywordScanner
+
+
+FILE_DIR = Path(__file__).parent
+
+
+def sorted_results(scan_results):
+    return {name: sorted(value) if isinstance(value, list) else value for name, value in vars(scan_results).items()}
+
+
+@pytest.fixture
+def watch_dir(tmp_path):
+    (tmp_path / "template_project" / "sub").mkdir(parents=True)
+    (tmp_path / "template_project" / "sub" / "template_project.py").write_text("template_project")
+    (tmp_path / "modified.txt").write_text("nothing")
+    (tmp_path / "logs").mkdir()
+    return tmp_path
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is only available on Linux")
+class TestInotifyWatcher:
+
+    def test_WatchedDir_ChangeFilesAndDirs_ChangedPathsReported(self, watch_dir):
+        with InotifyWatcher(watch_dir, ["logs"]) as watcher:
+            (watch_dir / "modified.txt").write_text("template_project")
+            (watch_dir / "template_project" / "sub").rename(watch_dir / "moved")
+            (watch_dir / "new_dir").mkdir()
+            (watch_dir / "logs" / "log.txt").write_text("template_project")
+
+            changed_paths = watcher.read_changes(timeout=1)
+            (watch_dir / "new_dir" / "new.txt").write_text("template_project")
+            (watch_dir / "moved" / "template_project.py").unlink()
+            changed_paths_of_new_dirs = watcher.read_changes(timeout=1)
+
+            assert changed_paths == {"modified.txt", "template_project/sub", "moved", "new_dir"}
+            assert changed_paths_of_new_dirs == {"new_dir/new.txt", "moved/template_project.py"}
+            assert watcher.read_changes(timeout=0.01) == set()
+
+    def test_ScannedDir_WatchWhileChangingFiles_ResultsSameAsFullScan(self, watch_dir):
+        keyword_scanner = KeywordScanner(watch_dir, ["template_project"])
+        with InotifyWatcher(watch_dir, ["logs"]) as watcher:
+            scan_results = keyword_scanner.scan()
+            (watch_dir / "modified.txt").write_text("template_project template_project")
+            (watch_dir / "template_project").rename(watch_dir / "renamed")
+            (watch_dir / "renamed" / "sub" / "template_project_2.py").write_text("template_project")
+
+            scan_results = keyword_scanner.update_paths(scan_results, watcher.read_changes(timeout=1))
+
+        assert sorted_results(scan_results) == sorted_results(keyword_scanner.scan())
+        assert scan_results.file_content_count == {"template_project": 4}
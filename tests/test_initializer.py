@@ -1,5 +1,6 @@
 # Copyright (C) 2024 twyleg
 # fmt: off
+import asyncio
 import os
 import shutil
 import sys
@@ -15,12 +16,18 @@ from _pytest.monkeypatch import MonkeyPatch
 
 from pathlib import Path
 
+from template_project_utils.keyword_scanner import KeywordScanner
+from template_project_utils.operation_plan import OperationPlan, OperationPlanExecutor
 from template_project_utils.template_initializer import TemplateInitializer
 
 
 FILE_DIR = Path(__file__).parent
 
 
+def pid_of_worker(_item):
+    return os.getpid()
+
+
 @dataclass
 class TestProject:
     path: Path
@@ -129,6 +136,43 @@ def template_project_python_usecase_qt_qml_app(tmp_path, monkeypatch):
     )
 
 
+@pytest.fixture
+def template_project_minimal(tmp_path, monkeypatch):
+    template_project_path = tmp_path / "template_project_minimal"
+    (template_project_path / "template_project_minimal" / "sub").mkdir(parents=True)
+    (template_project_path / "template_project_minimal" / "__init__.py").write_text("import template_project_minimal\n")
+    (template_project_path / "template_project_minimal" / "template_project_minimal_main.py").write_text("# template-project-minimal\n")
+    (template_project_path / "template_project_minimal" / "sub" / "data.txt").write_text("template_project_minimal " * 100)
+    (template_project_path / "README.md").write_text("# template_project_minimal\n\nUse template-project-minimal\n")
+    (template_project_path / "remove_me.txt").write_text("template_project_minimal\n")
+    (template_project_path / "remove_me").mkdir()
+    (template_project_path / "remove_me" / "file.txt").write_text("template_project_minimal\n")
+    (template_project_path / "template_config.yaml").write_text(yaml.safe_dump({
+        "placeholder": ["template_project_minimal", "template-project-minimal"],
+        "update_files": [
+            "README.md",
+            "template_project_minimal/__init__.py",
+            "template_project_minimal/template_project_minimal_main.py",
+            "template_project_minimal/sub/data.txt",
+        ],
+        "rename_files": ["template_project_minimal/template_project_minimal_main.py"],
+        "rename_dirs": ["template_project_minimal"],
+        "remove_files": ["remove_me.txt", "template_config.yaml"],
+        "remove_dirs": ["remove_me"],
+    }))
+    monkeypatch.chdir(template_project_path)
+    pygit2.init_repository(template_project_path, False).remotes.create("origin", "git@github.com:twyleg/template_project_minimal.git")
+
+    return TestProject(
+        path=template_project_path,
+        config=read_template_config(template_project_path / "template_config.yaml"),
+        placeholder_target_pairs={
+            "template_project_minimal": "test_target_name",
+            "template-project-minimal": "test-target-name",
+        }
+    )
+
+
 def is_git_remote_origin_still_existing(test_project: TestProject) -> bool:
     repo = pygit2.Repository(str(test_project.path))
     remote_collection = pygit2.remotes.RemoteCollection(repo)
@@ -232,6 +276,11 @@ def assert_project_correctly_initialized(test_project: TestProject) -> None:
 
 
 class TestInitializerForAllTemplateTypes:
+    def test_ValidTemplateProjectMinimal_InitializeTemplate_InitializationSuccessful(self, template_project_minimal):
+        template_initializer = TemplateInitializer(template_project_minimal.path)
+        template_initializer.init(template_project_minimal.placeholder_target_pairs)
+        assert_project_correctly_initialized(template_project_minimal)
+
     def test_ValidTemplateProjectCppMaster_InitializeTemplate_InitializationSuccessful(self, template_project_cpp_master):
         template_initializer = TemplateInitializer(template_project_cpp_master.path)
         template_initializer.init({"template_project_cpp": "test_target_name"})
@@ -293,3 +342,230 @@ class TestInitializerDetails:
                 config_file_or_dir_path=template_project_python_master.path / "template_config.yaml",
                 working_dir_path=Path("/not/existing/working/dir")
             )
+
+
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_TemplateProjectWithoutPlaceholders_InitializeTemplate_OnlyRemovalsExecuted(self, template_project_minimal, jobs):
+        config = dict(template_project_minimal.config, placeholder=[])
+        (template_project_minimal.path / "template_config.yaml").write_text(yaml.safe_dump(config))
+
+        plan = TemplateInitializer(template_project_minimal.path, jobs=jobs).init()
+
+        assert plan.operations_of_type(OperationPlan.OperationType.UPDATE_FILE) == []
+        assert plan.operations_of_type(OperationPlan.OperationType.RENAME_DIR) == []
+        assert len(plan.skipped_files) == 4
+        assert not (template_project_minimal.path / "remove_me.txt").exists()
+        assert not (template_project_minimal.path / "remove_me").exists()
+        assert (template_project_minimal.path / "README.md").read_text() == "# template_project_minimal\n\nUse template-project-minimal\n"
+
+    def test_TemplateProjectWithoutPlaceholders_InitializeTemplateAsync_OnlyRemovalsExecuted(self, template_project_minimal):
+        config = dict(template_project_minimal.config, placeholder=[])
+        (template_project_minimal.path / "template_config.yaml").write_text(yaml.safe_dump(config))
+
+        asyncio.run(TemplateInitializer(template_project_minimal.path).ainit())
+
+        assert not (template_project_minimal.path / "remove_me").exists()
+
+
+class TestInitializerGlobPatterns:
+
+    def test_ValidTemplateProjectMinimalWithGlobConfig_InitializeTemplate_InitializationSuccessful(self, template_project_minimal):
+        config_file_path = template_project_minimal.path / "template_config.yaml"
+        config_file_path.write_text(yaml.safe_dump({
+            "placeholder": ["template_project_minimal", "template-project-minimal"],
+            "update_files": ["**/*.py", "**/*.txt", "*.md", "!remove_me*", "!remove_me/**"],
+            "rename_files": ["**/template_project_minimal*.py"],
+            "rename_dirs": ["**/template_project_minimal"],
+            "remove_files": ["remove_me.txt", "template_config.yaml"],
+            "remove_dirs": ["remove_me"],
+        }))
+
+        template_initializer = TemplateInitializer(template_project_minimal.path)
+        template_initializer.init(template_project_minimal.placeholder_target_pairs)
+
+        assert not is_any_placeholder_still_existing(template_project_minimal)
+        assert not is_git_remote_origin_still_existing(template_project_minimal)
+        assert (template_project_minimal.path / "test_target_name" / "test_target_name_main.py").exists()
+
+
+class TestInitializerCaseVariants:
+
+    def test_ValidTemplateProjectMinimalWithCaseVariants_InitializeTemplateWithSingleTarget_AllVariantsReplaced(self, template_project_minimal):
+        config_file_path = template_project_minimal.path / "template_config.yaml"
+        config = read_template_config(config_file_path)
+        config["placeholder"] = [{"name": "template_project_minimal", "variants": ["snake", "kebab", "camel", "upper"]}]
+        config_file_path.write_text(yaml.safe_dump(config))
+        (template_project_minimal.path / "README.md").write_text("TemplateProjectMinimal TEMPLATE_PROJECT_MINIMAL template-project-minimal")
+
+        template_initializer = TemplateInitializer(template_project_minimal.path)
+        template_initializer.init({"template_project_minimal": "test_target_name"})
+
+        assert template_initializer.placeholders == ["template_project_minimal", "template-project-minimal", "TemplateProjectMinimal", "TEMPLATE_PROJECT_MINIMAL"]
+        assert template_initializer.placeholder_target_dict == {"template_project_minimal": "test_target_name"}
+        assert (template_project_minimal.path / "README.md").read_text() == "TestTargetName TEST_TARGET_NAME test-target-name"
+        assert KeywordScanner(template_project_minimal.path, template_initializer.placeholders).scan().empty()
+        assert_project_correctly_initialized(template_project_minimal)
+
+
+class TestInitializerAutoDiscovery:
+
+    def test_ValidTemplateProjectMinimalWithoutUpdateAndRenameLists_InitializeTemplateWithScanResults_InitializationSuccessful(self, template_project_minimal):
+        config_file_path = template_project_minimal.path / "template_config.yaml"
+        config = read_template_config(config_file_path)
+        config.update({"update_files": None, "rename_files": None, "rename_dirs": None})
+        config_file_path.write_text(yaml.safe_dump(config))
+        (template_project_minimal.path / "template_project_minimal" / "sub" / "template_project_minimal_sub").mkdir()
+
+        keyword_scanner = KeywordScanner(template_project_minimal.path, list(template_project_minimal.placeholder_target_pairs.keys()))
+        template_initializer = TemplateInitializer(template_project_minimal.path)
+        template_initializer.init(template_project_minimal.placeholder_target_pairs, scan_results=keyword_scanner.scan())
+
+        assert not is_any_placeholder_still_existing(template_project_minimal)
+        assert (template_project_minimal.path / "test_target_name" / "sub" / "test_target_name_sub").is_dir()
+        assert not is_any_remove_file_candidate_still_existing(template_project_minimal)
+        assert not is_any_remove_dir_candidate_still_existing(template_project_minimal)
+
+
+class TestInitializerParallel:
+
+    @pytest.mark.parametrize("executor_type", list(TemplateInitializer.ExecutorType))
+    def test_ValidTemplateProjectMinimal_InitializeTemplateWithMultipleJobs_InitializationSuccessful(self, template_project_minimal, executor_type):
+        template_initializer = TemplateInitializer(template_project_minimal.path, jobs=4, executor_type=executor_type)
+        template_initializer.init(template_project_minimal.placeholder_target_pairs)
+        assert_project_correctly_initialized(template_project_minimal)
+        assert (template_project_minimal.path / "test_target_name/sub/data.txt").read_text() == "test_target_name " * 100
+
+    def test_ProcessExecutor_MapBlocking_ItemsMappedInWorkerProcesses(self):
+        executor = OperationPlanExecutor(jobs=2, executor_type=OperationPlanExecutor.ExecutorType.PROCESS)
+
+        pids = executor.map_blocking(pid_of_worker, range(8))
+
+        assert len(pids) == 8
+        assert os.getpid() not in pids
+
+    def test_ValidTemplateProjectMinimal_InitializeTemplateDurable_InitializationSuccessful(self, template_project_minimal):
+        template_initializer = TemplateInitializer(template_project_minimal.path, jobs=4, durable=True)
+        template_initializer.init(template_project_minimal.placeholder_target_pairs)
+        assert_project_correctly_initialized(template_project_minimal)
+
+    def test_ValidTemplateProjectMinimal_InitializeTemplateWithMissingUpdateFile_ErrorRaised(self, template_project_minimal):
+        (template_project_minimal.path / "README.md").unlink()
+        template_initializer = TemplateInitializer(template_project_minimal.path, jobs=4)
+        with pytest.raises(FileNotFoundError):
+            template_initializer.init(template_project_minimal.placeholder_target_pairs)
+
+
+class TestInitializerOperationPlan:
+
+    def test_ValidTemplateProjectMinimal_PlanSavedAndExecutedOnCopy_InitializationSuccessful(self, template_project_minimal, tmp_path):
+        second_template_project_path = tmp_path / "second" / template_project_minimal.path.name
+        shutil.copytree(template_project_minimal.path, second_template_project_path)
+        plan_file_path = tmp_path / "plan.json"
+
+        TemplateInitializer(template_project_minimal.path).plan(template_project_minimal.placeholder_target_pairs).save(plan_file_path)
+        OperationPlanExecutor().execute(OperationPlan.load(plan_file_path), second_template_project_path)
+
+        assert_project_correctly_initialized(TestProject(
+            path=second_template_project_path,
+            config=template_project_minimal.config,
+            placeholder_target_pairs=template_project_minimal.placeholder_target_pairs
+        ))
+        assert is_any_placeholder_still_existing(template_project_minimal)
+
+    def test_ValidTemplateProjectMinimal_Plan_OperationsWithCountsInExecutionOrder(self, template_project_minimal):
+        (template_project_minimal.path / "no_placeholder.txt").write_text("nothing to see\n")
+        config_file_path = template_project_minimal.path / "template_config.yaml"
+        config = read_template_config(config_file_path)
+        config["update_files"].append("no_placeholder.txt")
+        config_file_path.write_text(yaml.safe_dump(config))
+
+        plan = TemplateInitializer(template_project_minimal.path).plan(template_project_minimal.placeholder_target_pairs)
+
+        assert plan.skipped_files == ["no_placeholder.txt"]
+        assert [operation.type for operation in plan.operations] == (
+            [OperationPlan.OperationType.UPDATE_FILE] * 4 +
+            [OperationPlan.OperationType.RENAME_FILE, OperationPlan.OperationType.RENAME_DIR] +
+            [OperationPlan.OperationType.REMOVE_FILE] * 2 +
+            [OperationPlan.OperationType.REMOVE_DIR, OperationPlan.OperationType.REMOVE_REMOTE]
+        )
+        rename_dir_operation = plan.operations_of_type(OperationPlan.OperationType.RENAME_DIR)[0]
+        assert rename_dir_operation.target_path == "test_target_name"
+        assert rename_dir_operation.files == 3
+        assert OperationPlan.from_dict(plan.to_dict()).to_dict() == plan.to_dict()
+        assert is_any_placeholder_still_existing(template_project_minimal)
+
+
+    def test_ValidTemplateProjectMinimal_Plan_UpdateFileTargetsAfterRenames(self, template_project_minimal):
+        plan = TemplateInitializer(template_project_minimal.path).plan(template_project_minimal.placeholder_target_pairs)
+
+        assert sorted(plan.update_file_targets()) == [
+            "README.md",
+            "test_target_name/__init__.py",
+            "test_target_name/sub/data.txt",
+            "test_target_name/test_target_name_main.py",
+        ]
+
+
+class TestInitializerIncrementalVerification:
+
+    @pytest.mark.parametrize("leftover", [False, True])
+    def test_ValidTemplateProjectMinimal_InitializeTemplate_IncrementalScanEqualsFullScan(self, template_project_minimal, leftover):
+        if leftover:
+            (template_project_minimal.path / "template_project_minimal" / "sub" / "template_project_minimal_unlisted").mkdir()
+            (template_project_minimal.path / "template_project_minimal" / "template_project_minimal_unlisted.txt").write_text("template_project_minimal")
+        keyword_scanner = KeywordScanner(template_project_minimal.path, list(template_project_minimal.placeholder_target_pairs.keys()))
+        prerun_scan_results = keyword_scanner.scan()
+
+        plan = TemplateInitializer(template_project_minimal.path).init(template_project_minimal.placeholder_target_pairs)
+        incremental_scan_results = keyword_scanner.scan_incremental(prerun_scan_results, plan)
+        full_scan_results = keyword_scanner.scan()
+
+        def normalized(scan_results):
+            return {name: sorted(value) if isinstance(value, list) else value for name, value in vars(scan_results).items()}
+
+        assert incremental_scan_results.empty() == (not leftover)
+        assert normalized(incremental_scan_results) == normalized(full_scan_results)
+
+
+class TestInitializerAsync:
+
+    def test_TwoCopiesOfTemplateProjectMinimal_InitializeConcurrentlyWithOneInstance_BothInitializationsSuccessful(self, template_project_minimal, tmp_path):
+        second_template_project_path = tmp_path / "second" / template_project_minimal.path.name
+        shutil.copytree(template_project_minimal.path, second_template_project_path)
+        second_template_project = TestProject(
+            path=second_template_project_path,
+            config=template_project_minimal.config,
+            placeholder_target_pairs=template_project_minimal.placeholder_target_pairs
+        )
+        template_initializer = TemplateInitializer(template_project_minimal.path, async_concurrency=2)
+
+        async def init_both():
+            await asyncio.gather(
+                template_initializer.ainit(template_project_minimal.placeholder_target_pairs),
+                template_initializer.ainit(template_project_minimal.placeholder_target_pairs, working_dir_path=second_template_project_path),
+            )
+
+        asyncio.run(init_both())
+
+        assert_project_correctly_initialized(template_project_minimal)
+        assert_project_correctly_initialized(second_template_project)
+        assert Path.cwd() == template_project_minimal.path
+
+    def test_TemplateProjectMinimal_PlanConcurrentlyInTwoEventLoopsWithOneInstance_BothPlansCreated(self, template_project_minimal):
+        template_initializer = TemplateInitializer(template_project_minimal.path, async_concurrency=1)
+
+        async def plan_twice():
+            return await asyncio.gather(
+                template_initializer.aplan(template_project_minimal.placeholder_target_pairs),
+                template_initializer.aplan(template_project_minimal.placeholder_target_pairs),
+            )
+
+        first_plans = asyncio.run(plan_twice())
+        second_plans = asyncio.run(plan_twice())
+
+        assert [plan.to_dict() for plan in first_plans] == [plan.to_dict() for plan in second_plans]
+
+    def test_InitializedTemplateProjectMinimal_ScanAsync_NoKeywordsFound(self, template_project_minimal):
+        TemplateInitializer(template_project_minimal.path).init(template_project_minimal.placeholder_target_pairs)
+        keyword_scanner = KeywordScanner(template_project_minimal.path, list(template_project_minimal.placeholder_target_pairs.keys()))
+        assert asyncio.run(keyword_scanner.ascan()).empty()
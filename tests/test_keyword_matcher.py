@@ -0,0 +1,34 @@
+# Copyright (C) 2024 twyleg
+# fmt: off
+import pytest
+
+from template_project_utils.keyword_matcher import KeywordMatcher
+
+
+class TestKeywordMatcher:
+
+    @pytest.mark.parametrize("keywords,data", [
+        (["template_project", "template_project_python", "project"], "template_project_python template_project"),
+        (["ab", "bc", "abab", "a"], "ababcabab"),
+        (["aa"], "aaaaa"),
+        (["x"], ""),
+    ])
+    def test_Keywords_Count_SameCountsAsStrCount(self, keywords, data):
+        assert KeywordMatcher(keywords).count(data) == {keyword: data.count(keyword) for keyword in keywords}
+
+    def test_BytesKeywords_CountWithCodeUnitSize_UnalignedMatchesIgnored(self):
+        data = "xtemplate".encode("utf-16-le")
+        keyword = "template".encode("utf-16-le")
+        assert KeywordMatcher([keyword]).count(data[1:] + b"\0", code_unit_size=2) == {keyword: 0}
+        assert KeywordMatcher([keyword]).count(data, code_unit_size=2) == {keyword: 1}
+
+    def test_Keywords_Matches_AllContainedKeywordsReturned(self):
+        assert KeywordMatcher(["template_project", "project", "python"]).matches("my_template_project") == {"template_project", "project"}
+
+    @pytest.mark.parametrize("data", ["template_project", b"template_project"])
+    def test_NoKeywords_IterOccurrencesCountAndMatches_NothingFound(self, data):
+        keyword_matcher = KeywordMatcher([])
+
+        assert list(keyword_matcher.iter_occurrences(data)) == []
+        assert keyword_matcher.count(data) == {}
+        assert keyword_matcher.matches(data) == set()
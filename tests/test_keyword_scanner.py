@@ -0,0 +1,199 @@
+# Copyright (C) 2024 twyleg
+# fmt: off
+import pygit2
+import pytest
+
+from pathlib import Path
+
+from template_project_utils.keyword_scanner import KeywordScanner
+
+
+FILE_DIR = Path(__file__).parent
+
+
+@pytest.fixture
+def scan_dir(tmp_path):
+    (tmp_path / "template_project").mkdir()
+    (tmp_path / "template_project" / "template_project.py").write_text("import template_project\r\n")
+    (tmp_path / "utf16.txt").write_text("template_project template_project", encoding="utf-16")
+    (tmp_path / "latin1.txt").write_bytes("çà template_project".encode("latin-1"))
+    (tmp_path / "binary.bin").write_bytes(b"\x00\x01template_project")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "template_project").write_text("template_project")
+    return tmp_path
+
+
+class TestKeywordScanner:
+
+    def test_DirWithKeywords_Scan_KeywordsCountedInAllTextEncodings(self, scan_dir):
+        scan_results = KeywordScanner(scan_dir, ["template_project"]).scan()
+
+        assert scan_results.dir_name_count == {"template_project": 1}
+        assert scan_results.file_name_count == {"template_project": 1}
+        assert scan_results.file_content_count == {"template_project": 4}
+        assert not scan_results.empty()
+
+    def test_DirWithoutKeywords_Scan_ResultsEmpty(self, scan_dir):
+        assert KeywordScanner(scan_dir, ["test_target_name"]).scan().empty()
+
+    def test_DirWithKeywords_ScanWithoutKeywords_ResultsEmpty(self, scan_dir):
+        assert KeywordScanner(scan_dir, []).scan().empty()
+
+    def test_DirWithExcludedDirs_Scan_ExcludedDirsOnlyIgnoredAtTopLevel(self, scan_dir):
+        for excluded_dir in ["venv", "logs"]:
+            (scan_dir / excluded_dir / "template_project").mkdir(parents=True)
+            (scan_dir / excluded_dir / "template_project" / "template_project.py").write_text("template_project")
+        (scan_dir / "template_project" / "logs").mkdir()
+        (scan_dir / "template_project" / "logs" / "log.txt").write_text("template_project")
+
+        scan_results = KeywordScanner(scan_dir, ["template_project"]).scan()
+
+        assert scan_results.dir_name_count == {"template_project": 1}
+        assert scan_results.file_content_count == {"template_project": 5}
+        assert "template_project/logs/log.txt" in scan_results.files_with_keyword_in_content
+
+    def test_DirWithKeywords_ScanWithMultipleJobs_ResultsIdenticalToSerialScan(self, scan_dir):
+        for i in range(20):
+            (scan_dir / "template_project" / f"file_{i}.txt").write_text("template_project " * i)
+
+        serial_scan_results = KeywordScanner(scan_dir, ["template_project"]).scan()
+        parallel_scan_results = KeywordScanner(scan_dir, ["template_project"], jobs=4).scan()
+
+        assert vars(parallel_scan_results) == vars(serial_scan_results)
+
+    def test_DirWithBinaries_Scan_BinariesSkippedAndListed(self, scan_dir):
+        (scan_dir / "image.dat").write_bytes(b"\x89PNG\r\n\x1a\ntemplate_project")
+        (scan_dir / "archive.zip").write_text("template_project")
+
+        scan_results = KeywordScanner(scan_dir, ["template_project"]).scan()
+
+        assert scan_results.file_content_count == {"template_project": 4}
+        assert sorted(scan_results.skipped_binary_files) == ["archive.zip", "binary.bin", "image.dat"]
+
+    def test_TextFilesWithAmbiguousExtensions_Scan_ContentScanned(self, scan_dir):
+        (scan_dir / "model.obj").write_text("o template_project\nv 0.0 0.0 0.0\n")
+        (scan_dir / "firmware.bin").write_text("template_project")
+
+        scan_results = KeywordScanner(scan_dir, ["template_project"]).scan()
+
+        assert {"firmware.bin", "model.obj"} <= set(scan_results.files_with_keyword_in_content)
+        assert scan_results.skipped_binary_files == ["binary.bin"]
+
+    def test_DirWithKeywords_ScanWithMmapForAllFiles_SameResultsAsInMemoryScan(self, scan_dir):
+        in_memory_scan_results = KeywordScanner(scan_dir, ["template_project"]).scan()
+        mmap_scan_results = KeywordScanner(scan_dir, ["template_project"], mmap_threshold=0).scan()
+
+        assert vars(mmap_scan_results) == vars(in_memory_scan_results)
+
+    def test_DirWithLargeFile_ScanWithMaxFileSize_LargeFileSkippedAndListed(self, scan_dir):
+        (scan_dir / "large.txt").write_text("template_project " * 100)
+
+        scan_results = KeywordScanner(scan_dir, ["template_project"], max_file_size=1000).scan()
+
+        assert scan_results.file_content_count == {"template_project": 4}
+        assert scan_results.skipped_large_files == ["large.txt"]
+
+    def test_GitRepoWithUntrackedFiles_ScanGitTracked_OnlyTrackedFilesScanned(self, scan_dir):
+        repo = pygit2.init_repository(scan_dir, False)
+        repo.index.add("template_project/template_project.py")
+        repo.index.add("utf16.txt")
+        repo.index.write()
+        (scan_dir / "build" / "template_project").mkdir(parents=True)
+        (scan_dir / "build" / "template_project" / "template_project.o").write_text("template_project")
+
+        scan_results = KeywordScanner(scan_dir, ["template_project"], git_tracked=True).scan()
+
+        assert scan_results.dirs_with_keyword_in_name == ["template_project"]
+        assert scan_results.files_with_keyword_in_content == ["template_project/template_project.py", "utf16.txt"]
+        assert scan_results.file_content_count == {"template_project": 3}
+
+    def test_GitRepoWithRenamedAndUntrackedFiles_ScanGitTrackedWithIndexRenames_RenamedTrackedFilesScannedAndOriginalUnchanged(self, scan_dir):
+        repo = pygit2.init_repository(scan_dir, False)
+        repo.index.add("template_project/template_project.py")
+        repo.index.add("utf16.txt")
+        repo.index.write()
+        (scan_dir / "template_project").rename(scan_dir / "renamed")
+        keyword_scanner = KeywordScanner(scan_dir, ["template_project"], git_tracked=True)
+
+        scan_results = keyword_scanner.with_index_renames([("template_project", "renamed")]).scan()
+
+        assert keyword_scanner.list_files() == ["utf16.txt"]
+        assert scan_results.files_with_keyword_in_name == ["renamed/template_project.py"]
+        assert scan_results.files_with_keyword_in_content == ["renamed/template_project.py", "utf16.txt"]
+
+    def test_GitRepoWithUntrackedFiles_UpdatePathsGitTracked_OnlyTrackedFilesScanned(self, scan_dir):
+        repo = pygit2.init_repository(scan_dir, False)
+        repo.index.add("template_project/template_project.py")
+        repo.index.write()
+        keyword_scanner = KeywordScanner(scan_dir, ["template_project"], git_tracked=True)
+        scan_results = keyword_scanner.scan()
+        (scan_dir / "template_project" / "untracked.txt").write_text("template_project")
+        (scan_dir / "build" / "template_project").mkdir(parents=True)
+
+        scan_results = keyword_scanner.update_paths(scan_results, ["template_project", "template_project/untracked.txt", "build", "utf16.txt"])
+
+        assert scan_results.dirs_with_keyword_in_name == ["template_project"]
+        assert scan_results.files_with_keyword_in_content == ["template_project/template_project.py"]
+        assert scan_results.file_content_count == {"template_project": 1}
+
+    def test_DirRemovedWhileWalked_UpdatePaths_RemainingPathsScanned(self, scan_dir, monkeypatch):
+        keyword_scanner = KeywordScanner(scan_dir, ["template_project"])
+        scan_results = keyword_scanner.scan()
+
+        def failing_walk(relative_dir_path=""):
+            yield "template_project/template_project.py", str(scan_dir / "template_project" / "template_project.py"), False
+            raise FileNotFoundError(relative_dir_path)
+
+        monkeypatch.setattr(keyword_scanner, "_walk", failing_walk)
+        scan_results = keyword_scanner.update_paths(scan_results, ["template_project"])
+
+        assert scan_results.dirs_with_keyword_in_name == ["template_project"]
+        assert scan_results.file_content_count == {"template_project": 4}
+
+    def test_DirWithKeywords_Scan_MatchOffsetsLinesAndColumnsIndexed(self, scan_dir):
+        (scan_dir / "lines.txt").write_text("x\n  template_project\ntemplate_project template_project")
+
+        scan_results = KeywordScanner(scan_dir, ["template_project"]).scan()
+
+        assert list(scan_results.file_matches["lines.txt"]) == [
+            ("template_project", 4, 2, 3),
+            ("template_project", 21, 3, 1),
+            ("template_project", 38, 3, 18),
+        ]
+        assert list(scan_results.file_matches["utf16.txt"]) == [("template_project", 2, 1, 1), ("template_project", 36, 1, 18)]
+
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_DirWithKeywords_IterMatches_SameMatchesAsScan(self, scan_dir, jobs):
+        keyword_scanner = KeywordScanner(scan_dir, ["template_project"], jobs=jobs)
+        scan_results = keyword_scanner.scan()
+
+        matches = list(keyword_scanner.iter_matches())
+
+        assert [match.path for match in matches if match.type == KeywordScanner.MatchType.DIR_NAME] == scan_results.dirs_with_keyword_in_name
+        assert [match.path for match in matches if match.type == KeywordScanner.MatchType.FILE_NAME] == scan_results.files_with_keyword_in_name
+        assert [match.path for match in matches if match.type == KeywordScanner.MatchType.FILE_CONTENT] == scan_results.files_with_keyword_in_content
+        assert sum(match.occurrences for match in matches if match.type == KeywordScanner.MatchType.FILE_CONTENT) == 4
+
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_ManyFilesWithKeywords_AnyMatch_ScanStoppedAtFirstMatch(self, tmp_path, monkeypatch, jobs):
+        for i in range(1000):
+            (tmp_path / f"file_{i}.txt").write_text("template_project")
+        keyword_scanner = KeywordScanner(tmp_path, ["template_project"], jobs=jobs)
+        count_content = keyword_scanner._count_content
+        read_paths = []
+        monkeypatch.setattr(keyword_scanner, "_count_content", lambda path: read_paths.append(path) or count_content(path))
+
+        match = keyword_scanner.any_match()
+
+        assert match.type == KeywordScanner.MatchType.FILE_CONTENT and match.occurrences == 1
+        assert len(read_paths) <= 1 + jobs * 64 + jobs
+
+    def test_DirWithoutKeywords_AnyMatch_NoMatch(self, scan_dir):
+        assert KeywordScanner(scan_dir, ["test_target_name"]).any_match() is None
+
+    def test_DirWithLargeFile_AnyMatchWithMaxFileSize_LargeFileReportedAsUnchecked(self, tmp_path):
+        (tmp_path / "large.txt").write_text("x" * 2000)
+
+        match = KeywordScanner(tmp_path, ["template_project"], max_file_size=1000).any_match()
+
+        assert match == KeywordScanner.Match(KeywordScanner.MatchType.UNCHECKED_CONTENT, "large.txt", "", 0)
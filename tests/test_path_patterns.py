@@ -0,0 +1,53 @@
+# Copyright (C) 2024 twyleg
+# fmt: off
+import pytest
+
+from pathlib import Path
+
+from template_project_utils.path_patterns import PathPatternList, resolve_path_pattern_lists
+
+
+@pytest.fixture
+def pattern_dir(tmp_path):
+    for relative_path in ["src/a.py", "src/b.txt", "src/x/c.py", "src/vendor/d.py", "README.md", ".git/e.py", "venv/f.py"]:
+        (tmp_path / relative_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / relative_path).touch()
+    return tmp_path
+
+
+class TestPathPatterns:
+
+    @pytest.mark.parametrize("pattern,relative_path,expected_match", [
+        ("src/**/*.py", "src/a.py", True),
+        ("src/**/*.py", "src/x/y/c.py", True),
+        ("src/**/*.py", "src/b.txt", False),
+        ("*.md", "README.md", True),
+        ("*.md", "docs/README.md", False),
+        ("src/?.py", "src/a.py", True),
+        ("src/[!a].py", "src/a.py", False),
+        ("src/**", "src/x/c.py", True),
+        ("src/[!]]x*", "src/ax.py", True),
+        ("src/[!]]x*", "src/]x.py", False),
+        ("src/[]]x*", "src/]x.py", True),
+        ("src/[^a]*", "src/^.py", True),
+        ("src/[^a]*", "src/b.py", False),
+    ])
+    def test_GlobPattern_Match_MatchedAsExpected(self, pattern, relative_path, expected_match):
+        assert (PathPatternList([pattern]).match(relative_path) is not None) == expected_match
+
+    def test_PathWithBrackets_ResolveWithoutGlobChars_PathKeptLiterally(self, pattern_dir):
+        (pattern_dir / "data[1].txt").touch()
+
+        path_pattern_list = PathPatternList(["data[1].txt"])
+
+        assert not path_pattern_list.has_globs()
+        assert resolve_path_pattern_lists(pattern_dir, {"files": path_pattern_list})["files"] == ["data[1].txt"]
+
+    def test_DirWithFiles_ResolveGlobsAndLiterals_LiteralsKeptAndGlobsExpandedWithoutExcludedPaths(self, pattern_dir):
+        resolved_paths = resolve_path_pattern_lists(pattern_dir, {
+            "files": PathPatternList(["README.md", "src/**/*.py", "!**/vendor/**", "not_existing.txt"]),
+            "dirs": PathPatternList(["src/*"], match_dirs=True),
+        })
+
+        assert resolved_paths["files"] == ["README.md", "src/x/c.py", "src/a.py", "not_existing.txt"]
+        assert resolved_paths["dirs"] == ["src/vendor", "src/x"]
@@ -0,0 +1,93 @@
+# Copyright (C) 2024 twyleg
+# fmt: off
+import os
+import sqlite3
+
+import pytest
+
+from template_project_utils.keyword_scanner import KeywordScanner
+from template_project_utils.match_index import FileMatches
+from template_project_utils.scan_cache import ScanCache, RACY_INTERVAL_NS
+
+
+@pytest.fixture
+def cache_scan_dir(tmp_path):
+    scan_dir = tmp_path / "scan_dir"
+    scan_dir.mkdir()
+    for i in range(3):
+        (scan_dir / f"file_{i}.txt").write_text("template_project " * i)
+    (scan_dir / "binary.dat").write_bytes(b"\0template_project")
+
+    # Files modified just now are not cached, so all mtimes are moved to the past
+    for path in scan_dir.iterdir():
+        os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns - 2 * RACY_INTERVAL_NS))
+    return scan_dir
+
+
+def count_content_reads(monkeypatch):
+    reads = []
+    count_content = KeywordScanner._count_content
+    monkeypatch.setattr(KeywordScanner, "_count_content", lambda self, path: reads.append(path) or count_content(self, path))
+    return reads
+
+
+class TestScanCache:
+
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_UnchangedDir_ScanTwice_SecondScanAnsweredFromCache(self, cache_scan_dir, tmp_path, monkeypatch, jobs):
+        scanner = KeywordScanner(cache_scan_dir, ["template_project"], jobs=jobs, scan_cache_file_path=tmp_path / "cache.sqlite3")
+        first_scan_results = scanner.scan()
+        reads = count_content_reads(monkeypatch)
+        second_scan_results = scanner.scan()
+
+        assert reads == []
+        assert vars(second_scan_results) == vars(first_scan_results)
+
+    def test_ModifiedFile_ScanAgain_OnlyModifiedFileRead(self, cache_scan_dir, tmp_path, monkeypatch):
+        scanner = KeywordScanner(cache_scan_dir, ["template_project"], scan_cache_file_path=tmp_path / "cache.sqlite3")
+        scanner.scan()
+        (cache_scan_dir / "file_1.txt").write_text("template_project template_project")
+        reads = count_content_reads(monkeypatch)
+
+        assert scanner.scan().file_content_count == {"template_project": 4}
+        assert reads == [cache_scan_dir / "file_1.txt"]
+
+    def test_ScannedDir_ScanWithOtherKeywords_CacheNotUsed(self, cache_scan_dir, tmp_path, monkeypatch):
+        KeywordScanner(cache_scan_dir, ["template_project"], scan_cache_file_path=tmp_path / "cache.sqlite3").scan()
+        reads = count_content_reads(monkeypatch)
+
+        KeywordScanner(cache_scan_dir, ["project"], scan_cache_file_path=tmp_path / "cache.sqlite3").scan()
+
+        assert len(reads) == 4
+
+    def test_FullCache_AddEntries_LeastRecentlyUsedEntriesEvicted(self, cache_scan_dir, tmp_path):
+        stat_results = {path: os.stat(cache_scan_dir / path) for path in ["file_0.txt", "file_1.txt", "file_2.txt"]}
+        for paths in [["file_0.txt", "file_1.txt"], ["file_0.txt", "file_2.txt"]]:
+            with ScanCache(tmp_path / "cache.sqlite3", ["template_project"], max_entries=2) as scan_cache:
+                for path in paths:
+                    if scan_cache.get(path, stat_results[path]) is None:
+                        scan_cache.put(path, stat_results[path], FileMatches("utf-8", 0, ["template_project"]))
+
+        with ScanCache(tmp_path / "cache.sqlite3", ["template_project"], max_entries=2) as scan_cache:
+            assert [scan_cache.get(path, stat_result) is not None for path, stat_result in stat_results.items()] == [True, False, True]
+
+    def test_BrokenCacheFile_Scan_CacheRecreated(self, cache_scan_dir, tmp_path):
+        (tmp_path / "cache.sqlite3").write_bytes(b"no database")
+        scan_results = KeywordScanner(cache_scan_dir, ["template_project"], scan_cache_file_path=tmp_path / "cache.sqlite3").scan()
+        assert scan_results.file_content_count == {"template_project": 3}
+
+    def test_BrokenCacheFile_Scan_BrokenConnectionClosed(self, cache_scan_dir, tmp_path, monkeypatch):
+        (tmp_path / "cache.sqlite3").write_bytes(b"no database")
+        connections = []
+        connect = sqlite3.connect
+
+        def recording_connect(*args, **kwargs):
+            connections.append(connect(*args, **kwargs))
+            return connections[-1]
+
+        monkeypatch.setattr(sqlite3, "connect", recording_connect)
+        KeywordScanner(cache_scan_dir, ["template_project"], scan_cache_file_path=tmp_path / "cache.sqlite3").scan()
+
+        assert len(connections) == 2
+        with pytest.raises(sqlite3.ProgrammingError):
+            connections[0].execute("SELECT 1")
@@ -0,0 +1,92 @@
+# Copyright (C) 2024 twyleg
+# fmt: off
+import io
+import json
+import pytest
+
+from pathlib import Path
+
+from template_project_utils.keyword_scanner import KeywordScanner
+from template_project_utils.scan_output import NdjsonScanOutput
+
+
+FILE_DIR = Path(__file__).parent
+
+
+@pytest.fixture
+def scan_dir(tmp_path):
+    (tmp_path / "template_project").mkdir()
+    (tmp_path / "template_project" / "template_project.py").write_text("import template_project\nfoo = template_project.foo\n")
+    (tmp_path / "binary.bin").write_bytes(b"\x00\x01template_project")
+    return tmp_path
+
+
+def read_records(stream: io.StringIO):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class TestNdjsonScanOutput:
+
+    def test_DirWithKeywords_ScanWithNdjsonOutput_OneRecordPerMatchAndSummary(self, scan_dir):
+        stream = io.StringIO()
+        scan_output = NdjsonScanOutput(stream, "prerun")
+
+        KeywordScanner(scan_dir, ["template_project"], scan_output=scan_output).scan()
+
+        assert sorted(read_records(stream)[:-1], key=lambda record: (record["type"], record["path"])) == [
+            {"scan": "prerun", "type": "content", "path": "template_project/template_project.py", "keyword": "template_project", "count": 2, "locations": [[1, 8], [2, 7]]},
+            {"scan": "prerun", "type": "dir_name", "path": "template_project", "keyword": "template_project"},
+            {"scan": "prerun", "type": "file_name", "path": "template_project/template_project.py", "keyword": "template_project"},
+            {"scan": "prerun", "type": "skipped", "path": "binary.bin", "reason": "binary"},
+        ]
+        assert read_records(stream)[-1] == {
+            "scan": "prerun",
+            "type": "summary",
+            "file_name_count": {"template_project": 1},
+            "dir_name_count": {"template_project": 1},
+            "file_content_count": {"template_project": 2},
+            "skipped_binary_files": 1,
+            "skipped_large_files": 0,
+            "empty": False,
+        }
+
+    def test_ManyFiles_ParallelScanWithNdjsonOutput_RecordsWrittenBeforeWalkFinishes(self, scan_dir, monkeypatch):
+        for i in range(50):
+            (scan_dir / "template_project" / f"file_{i:02}.txt").write_text("template_project")
+        stream = io.StringIO()
+        keyword_scanner = KeywordScanner(scan_dir, ["template_project"], jobs=2, scan_output=NdjsonScanOutput(stream))
+        monkeypatch.setattr("template_project_utils.keyword_scanner.PARALLEL_SCAN_WINDOW", 1)
+
+        walked_paths = []
+        records_written_during_walk = []
+        walk_selected = keyword_scanner._walk_selected
+
+        def recording_walk_selected():
+            for entry in walk_selected():
+                walked_paths.append(entry[0])
+                records_written_during_walk.append(len(read_records(stream)))
+                yield entry
+
+        monkeypatch.setattr(keyword_scanner, "_walk_selected", recording_walk_selected)
+        keyword_scanner.scan()
+
+        content_paths = [record["path"] for record in read_records(stream) if record["type"] == "content"]
+        assert content_paths == [path for path in walked_paths if path.endswith(".txt") or path.endswith(".py")]
+        assert records_written_during_walk[-1] > 50
+
+    def test_ScannedDir_UpdatePathsWithNdjsonOutput_RemovedRecordBeforeNewRecords(self, scan_dir):
+        keyword_scanner = KeywordScanner(scan_dir, ["template_project"])
+        scan_results = keyword_scanner.scan()
+        stream = io.StringIO()
+        keyword_scanner.scan_output = NdjsonScanOutput(stream, "watch")
+        (scan_dir / "template_project" / "template_project.py").write_text("template_project")
+        (scan_dir / "binary.bin").unlink()
+
+        keyword_scanner.update_paths(scan_results, ["template_project/template_project.py", "binary.bin"])
+
+        assert read_records(stream)[:-1] == [
+            {"scan": "watch", "type": "removed", "path": "binary.bin"},
+            {"scan": "watch", "type": "removed", "path": "template_project/template_project.py"},
+            {"scan": "watch", "type": "file_name", "path": "template_project/template_project.py", "keyword": "template_project"},
+            {"scan": "watch", "type": "content", "path": "template_project/template_project.py", "keyword": "template_project", "count": 1, "locations": [[1, 1]]},
+        ]
@@ -0,0 +1,118 @@
+# Copyright (C) 2024 twyleg
+# fmt: off
+import os
+
+import pytest
+
+from pathlib import Path
+
+from template_project_utils.substitution import Substitution
+from template_project_utils.text_encoding import EncodedKeywords
+
+
+class TestSubstitution:
+
+    def test_OverlappingPlaceholders_Replace_LongestPlaceholderWins(self):
+        substitution = Substitution({
+            "template_project": "short_target",
+            "template_project_python": "long_target",
+        })
+        assert substitution.replace("template_project_python template_project") == "long_target short_target"
+
+    def test_MultiplePlaceholders_Replace_TargetsAreNotReplacedAgain(self):
+        substitution = Substitution({
+            "foo": "bar",
+            "bar": "baz",
+        })
+        assert substitution.replace("foo bar") == "bar baz"
+
+    def test_FileWithMultiplePlaceholders_ReplaceInFile_AllPlaceholdersReplaced(self, tmp_path: Path):
+        filepath = tmp_path / "file.txt"
+        filepath.write_text("template_project_python\ntemplate-project-python\n")
+
+        Substitution({
+            "template_project_python": "test_target_name",
+            "template-project-python": "test-target-name",
+        }).replace_in_file(filepath)
+
+        assert filepath.read_text() == "test_target_name\ntest-target-name\n"
+
+    def test_NoPlaceholders_CreateSubstitution_ValueErrorRaised(self):
+        with pytest.raises(ValueError):
+            Substitution({})
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+    def test_PlaceholdersCrossingChunkBoundaries_ReplaceInFileStreaming_SameResultAsInMemory(self, tmp_path: Path, chunk_size: int):
+        content = "template_project_python;template_project;xtemplate_project_pythonx\n" * 5
+        filepath = tmp_path / "file.txt"
+        filepath.write_text(content)
+        placeholder_target_dict = {
+            "template_project": "short_target",
+            "template_project_python": "long_target",
+        }
+
+        Substitution(placeholder_target_dict, streaming_threshold=0, chunk_size=chunk_size).replace_in_file(filepath)
+
+        assert filepath.read_text() == Substitution(placeholder_target_dict).replace(content)
+        assert list(tmp_path.iterdir()) == [filepath]
+
+    @pytest.mark.parametrize("streaming_threshold", [0, 1024])
+    def test_ExecutableFile_ReplaceInFile_ModeBitsPreservedAndNoTempFilesLeft(self, tmp_path: Path, streaming_threshold: int):
+        filepath = tmp_path / "script.sh"
+        filepath.write_text("#!/bin/sh\necho template_project\n")
+        filepath.chmod(0o751)
+
+        Substitution({"template_project": "test_target_name"}, streaming_threshold=streaming_threshold).replace_in_file(filepath)
+
+        assert filepath.read_text() == "#!/bin/sh\necho test_target_name\n"
+        assert filepath.stat().st_mode & 0o777 == 0o751
+        assert list(tmp_path.iterdir()) == [filepath]
+
+    def test_FileWithoutPlaceholders_ReplaceInFile_FileNotRewritten(self, tmp_path: Path):
+        filepath = tmp_path / "file.txt"
+        filepath.write_text("nothing to replace\n")
+        os.utime(filepath, ns=(0, 0))
+
+        rewritten = Substitution({"template_project": "test_target_name"}).replace_in_file(filepath)
+
+        assert not rewritten
+        assert filepath.stat().st_mtime_ns == 0
+
+    def test_EmptyFile_ReplaceInFile_FileNotRewritten(self, tmp_path: Path):
+        filepath = tmp_path / "file.txt"
+        filepath.touch()
+        assert not Substitution({"template_project": "test_target_name"}).replace_in_file(filepath)
+
+    @pytest.mark.parametrize("streaming_threshold", [0, 1024])
+    @pytest.mark.parametrize("encoding", ["utf-8-sig", "utf-16", "utf-16-be", "utf-32", "latin-1"])
+    def test_FileWithBomAndCrlf_ReplaceInFile_EncodingBomAndLineEndingsPreserved(self, tmp_path: Path, encoding: str, streaming_threshold: int):
+        filepath = tmp_path / "file.txt"
+        content = "# template_project\r\nçà template_project\r\n"
+        filepath.write_bytes(content.encode(encoding))
+        if encoding == "utf-16-be":
+            filepath.write_bytes(b"\xfe\xff" + content.encode(encoding))
+
+        Substitution({"template_project": "test_target_name"}, streaming_threshold=streaming_threshold, chunk_size=3).replace_in_file(filepath)
+
+        expected_content = content.replace("template_project", "test_target_name").encode(encoding)
+        if encoding == "utf-16-be":
+            expected_content = b"\xfe\xff" + expected_content
+        assert filepath.read_bytes() == expected_content
+
+    @pytest.mark.parametrize("encoding", ["utf-8", "utf-16-le"])
+    def test_KnownMatchOffsets_ReplaceBytesAtMatches_SameResultAsRegexReplacement(self, encoding: str):
+        placeholder_target_dict = {"template_project": "short_target", "template_project_python": "long_target", "aa": "b"}
+        substitution = Substitution(placeholder_target_dict)
+        data = "template_project_python\n xaaa template_project".encode(encoding)
+        file_matches = EncodedKeywords(list(placeholder_target_dict.keys())).find(data, encoding, 0)
+
+        assert substitution.replace_bytes_at_matches(data, file_matches) == substitution.replace_bytes(data, encoding)
+
+    def test_StaleMatchOffsets_ReplaceInFile_FallbackToRegexReplacement(self, tmp_path: Path):
+        substitution = Substitution({"template_project": "target"})
+        file_matches = EncodedKeywords(["template_project"]).find(b"template_project", "utf-8", 0)
+        (tmp_path / "file.txt").write_bytes(b"  template_project")
+
+        assert substitution.replace_bytes_at_matches(b"  template_project", file_matches) is None
+        substitution.replace_in_file(tmp_path / "file.txt", file_matches=file_matches)
+        assert (tmp_path / "file.txt").read_bytes() == b"  target"
@@ -0,0 +1,103 @@
+# Copyright (C) 2024 twyleg
+# fmt: off
+import shutil
+import pytest
+import yaml
+
+from pathlib import Path
+
+from template_project_utils.keyword_scanner import KeywordScanner
+from template_project_utils.template_artifact import TemplateArtifact
+from template_project_utils.template_initializer import TemplateInitializer
+
+
+FILE_DIR = Path(__file__).parent
+
+
+@pytest.fixture
+def template_dir(tmp_path, monkeypatch):
+    template_dir_path = tmp_path / "template"
+    (template_dir_path / "template_project").mkdir(parents=True)
+    (template_dir_path / "template_project" / "template_project_main.py").write_text("import template_project\nprint('template_project')\n")
+    (template_dir_path / "README.md").write_text("# template_project\n")
+    (template_dir_path / "remove_me.txt").write_text("template_project")
+    (template_dir_path / "template_config.yaml").write_text(yaml.safe_dump({
+        "placeholder": ["template_project"],
+        "update_files": ["README.md", "template_project/template_project_main.py"],
+        "rename_files": ["template_project/template_project_main.py"],
+        "rename_dirs": ["template_project"],
+        "remove_files": ["remove_me.txt", "template_config.yaml"],
+        "remove_dirs": None,
+    }))
+    monkeypatch.chdir(tmp_path)
+    return template_dir_path
+
+
+def compile_artifact(template_dir_path: Path) -> TemplateArtifact:
+    template_initializer = TemplateInitializer(template_dir_path)
+    keyword_scanner = KeywordScanner(template_dir_path, template_initializer.placeholders)
+    scan_results = keyword_scanner.scan()
+    return TemplateArtifact(
+        template_initializer.placeholders,
+        False,
+        keyword_scanner.settings(),
+        TemplateArtifact.hash_files(keyword_scanner),
+        scan_results,
+        template_initializer.compile_plan(),
+    )
+
+
+class TestTemplateArtifact:
+
+    def test_CompiledArtifact_SaveAndLoad_SameArtifact(self, template_dir, tmp_path):
+        artifact = compile_artifact(template_dir)
+
+        artifact.save(tmp_path / "artifact.json")
+        loaded_artifact = TemplateArtifact.load(tmp_path / "artifact.json")
+
+        assert loaded_artifact.to_dict() == artifact.to_dict()
+        assert vars(loaded_artifact.scan_results) == vars(artifact.scan_results)
+        assert all(operation.target_path is None for operation in loaded_artifact.compiled_plan.operations)
+
+    @pytest.mark.parametrize("change", ["modified", "added", "removed"])
+    def test_CompiledArtifact_ChangeTemplateFile_ArtifactInvalid(self, template_dir, change):
+        artifact = compile_artifact(template_dir)
+        keyword_scanner = KeywordScanner(template_dir, artifact.placeholders)
+        assert artifact.is_valid(artifact.placeholders, False, keyword_scanner)
+
+        if change == "modified":
+            (template_dir / "README.md").write_text("# template_project!\n")
+        elif change == "added":
+            (template_dir / "new.txt").write_text("")
+        else:
+            (template_dir / "remove_me.txt").unlink()
+
+        assert not artifact.is_valid(artifact.placeholders, False, keyword_scanner)
+
+    @pytest.mark.parametrize("setting, value", [("max_file_size", 1000), ("git_tracked", True), ("mmap_threshold", 0)])
+    def test_CompiledArtifact_CheckWithOtherScanSettings_ArtifactInvalid(self, template_dir, setting, value):
+        artifact = compile_artifact(template_dir)
+        keyword_scanner = KeywordScanner(template_dir, artifact.placeholders, **{setting: value})
+
+        assert not artifact.is_valid(artifact.placeholders, False, keyword_scanner)
+
+    def test_CompiledArtifact_InitializeCopyFromArtifact_SameResultAsInitializationFromScan(self, template_dir, tmp_path):
+        artifact = compile_artifact(template_dir)
+        shutil.copytree(template_dir, tmp_path / "from_artifact")
+        shutil.copytree(template_dir, tmp_path / "from_scan")
+
+        template_initializer = TemplateInitializer(template_dir)
+        template_initializer.init(
+            {"template_project": "my_project"},
+            working_dir_path=tmp_path / "from_artifact",
+            scan_results=artifact.scan_results,
+            compiled_plan=artifact.compiled_plan,
+        )
+        TemplateInitializer(tmp_path / "from_scan").init({"template_project": "my_project"})
+
+        def tree(path):
+            return {file_path.relative_to(path).as_posix(): file_path.read_bytes() for file_path in sorted(path.rglob("*")) if file_path.is_file()}
+
+        assert tree(tmp_path / "from_artifact") == tree(tmp_path / "from_scan")
+        assert (tmp_path / "from_artifact" / "my_project" / "my_project_main.py").read_text() == "import my_project\nprint('my_project')\n"
+        assert (template_dir / "template_project").is_dir()